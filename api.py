@@ -0,0 +1,225 @@
+# api.py
+#
+# JSON API for machine clients (registered on the Flask app in app.py).
+#
+#   GET  /api/apps                  apps by descending risk score, cursor-paginated
+#   GET  /api/apps/<package_name>   one app
+#   GET  /api/apps:top              the k riskiest apps, optionally above a score
+#   POST /api/apps:batchGet         several apps by package name
+#   GET  /api/changes?since=<seq>   what changed between scans since seq
+#
+# Every apps endpoint supports ?fields=a,b,c projection. Rows are read straight
+# from the current snapshot (its columns, or SQL with SPYSHIELD_DB);
+# nothing is copied per request beyond the page being returned.
+
+import base64
+import binascii
+import json
+import math
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+from flask import Blueprint, abort, current_app, jsonify, request
+
+from appstore import EXTRA_FIELDS, FLAG_FIELDS, RISK_LEVELS, ROW_FIELDS
+from response_cache import cached_view
+from snapshot import AnySnapshot
+
+api = Blueprint("api", __name__, url_prefix="/api")
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+MAX_BATCH_GET = 1000
+DEFAULT_TOP_K = 50
+ALL_FIELDS = ROW_FIELDS + EXTRA_FIELDS
+
+_TRUE = {"1", "true", "yes"}
+_FALSE = {"0", "false", "no"}
+
+
+def _snapshot() -> AnySnapshot:
+    return current_app.extensions["spyshield"].current
+
+
+def _parse_fields(raw: Optional[str]) -> Sequence[str]:
+    if not raw:
+        return ALL_FIELDS
+    fields = [f.strip() for f in raw.split(",") if f.strip()]
+    unknown = [f for f in fields if f not in ALL_FIELDS]
+    if unknown:
+        abort(400, description=f"Unknown field(s): {', '.join(unknown)}")
+    return fields
+
+
+def _project(app: Mapping[str, Any], fields: Sequence[str]) -> Dict[str, Any]:
+    return {name: app.get(name) for name in fields}
+
+
+def _encode_cursor(state: Dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(state).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, binascii.Error):
+        abort(400, description="Invalid cursor")
+    if not isinstance(state, dict) or not state:
+        abort(400, description="Invalid cursor")
+    return state
+
+
+def _flag_filters() -> Dict[str, int]:
+    filters: Dict[str, int] = {}
+    for name in FLAG_FIELDS:
+        raw = request.args.get(name)
+        if raw is None:
+            continue
+        if raw.lower() in _TRUE:
+            filters[name] = 1
+        elif raw.lower() in _FALSE:
+            filters[name] = 0
+        else:
+            abort(400, description=f"{name} must be true or false")
+    return filters
+
+
+@api.route("/apps")
+@cached_view
+def list_apps():
+    """
+    Apps by descending risk score.
+
+    Query args: level, any boolean flag (e.g. is_system_app=false),
+    permission (repeatable: apps holding all of them), fields, limit
+    (max 1000) and cursor (from the previous next_cursor).
+    """
+    snapshot = _snapshot()
+    fields = _parse_fields(request.args.get("fields"))
+
+    level = request.args.get("level", "").capitalize() or None
+    if level is not None and level not in RISK_LEVELS:
+        abort(400, description=f"Unknown risk level: {level}")
+
+    limit = request.args.get("limit", DEFAULT_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    cursor = request.args.get("cursor")
+    permissions = [p for p in request.args.getlist("permission") if p]
+    try:
+        rows, next_state = snapshot.ranked(
+            level,
+            _flag_filters(),
+            _decode_cursor(cursor) if cursor else None,
+            limit,
+            permissions,
+        )
+    except (ValueError, KeyError, TypeError):
+        abort(400, description="Invalid cursor")
+
+    apps = [_project(row, fields) for row in rows]
+    next_cursor = _encode_cursor(next_state) if next_state else None
+
+    return jsonify(
+        {
+            "generation": snapshot.generation,
+            "apps": apps,
+            "next_cursor": next_cursor,
+        }
+    )
+
+
+@api.route("/apps/<package_name>")
+@cached_view
+def get_app(package_name: str):
+    snapshot = _snapshot()
+    app = snapshot.apps.get(package_name)
+    if app is None:
+        abort(404, description="App not found")
+    fields = _parse_fields(request.args.get("fields"))
+    return jsonify({"generation": snapshot.generation, "app": _project(app, fields)})
+
+
+@api.route("/apps:top")
+@cached_view
+def top_apps():
+    """
+    The riskiest apps, without paging: "worst offenders" views and alerts.
+
+    Query args: k (default 50, max 1000), min_score (only apps scoring at
+    least this), level and fields.
+    """
+    snapshot = _snapshot()
+    fields = _parse_fields(request.args.get("fields"))
+
+    level = request.args.get("level", "").capitalize() or None
+    if level is not None and level not in RISK_LEVELS:
+        abort(400, description=f"Unknown risk level: {level}")
+    k = max(1, min(request.args.get("k", DEFAULT_TOP_K, type=int), MAX_PAGE_SIZE))
+    min_score = None
+    raw_min_score = request.args.get("min_score")
+    if raw_min_score is not None:
+        try:
+            min_score = float(raw_min_score)
+        except ValueError:
+            min_score = math.nan
+        if not math.isfinite(min_score):
+            abort(400, description="min_score must be a number")
+
+    rows = snapshot.top(k, level, min_score)
+    return jsonify(
+        {
+            "generation": snapshot.generation,
+            "apps": [_project(row, fields) for row in rows],
+        }
+    )
+
+
+@api.route("/apps:batchGet", methods=["POST"])
+def batch_get_apps():
+    """
+    Body: {"package_names": [...], "fields": [...] (optional)}.
+    Returns the found apps in request order, plus the missing names.
+    """
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        abort(400, description="Body must be a JSON object")
+    names = body.get("package_names")
+    if not isinstance(names, list) or not all(isinstance(n, str) for n in names):
+        abort(400, description="package_names must be a list of strings")
+    if len(names) > MAX_BATCH_GET:
+        abort(400, description=f"At most {MAX_BATCH_GET} package names per request")
+    raw_fields = body.get("fields")
+    if raw_fields is not None and (
+        not isinstance(raw_fields, list) or not all(isinstance(f, str) for f in raw_fields)
+    ):
+        abort(400, description="fields must be a list of strings")
+    fields = _parse_fields(",".join(raw_fields) if raw_fields is not None else None)
+
+    snapshot = _snapshot()
+    apps: List[Dict[str, Any]] = []
+    missing: List[str] = []
+    for name in names:
+        app = snapshot.apps.get(name)
+        if app is None:
+            missing.append(name)
+        else:
+            apps.append(_project(app, fields))
+
+    return jsonify({"generation": snapshot.generation, "apps": apps, "missing": missing})
+
+
+@api.route("/changes")
+def list_changes():
+    """
+    Scan-to-scan deltas published after ?since= (default 0), oldest first,
+    with the latest sequence number to pass next time. 410 if some were
+    already dropped from the feed: reload /api/apps instead. Only the
+    scanning process keeps a feed (not gunicorn followers): 404 there.
+    """
+    feed = getattr(current_app.extensions["spyshield"], "feed", None)
+    if feed is None:
+        abort(404, description="No change feed in this process")
+    since = request.args.get("since", 0, type=int)
+    latest, deltas = feed.since(max(0, since))
+    if deltas is None:
+        abort(410, description=f"Changes since {since} are no longer kept; reload the apps")
+    return jsonify({"seq": latest, "deltas": [delta.to_dict() for delta in deltas]})
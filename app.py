@@ -1,39 +1,210 @@
 # app.py
 
-from flask import Flask, render_template, abort
-from storage import load_apps
+import os
+from typing import Optional, Tuple
+
+from flask import (
+    Flask,
+    Response,
+    abort,
+    jsonify,
+    make_response,
+    redirect,
+    render_template,
+    request,
+    url_for,
+)
+
+from api import api
+from appstore import RISK_LEVELS
+from assets import init_assets
+from metrics import METRICS, RENDER_SECONDS, Sample, snapshot_samples
+from publisher import DEFAULT_SNAPSHOT_PATH
+from response_cache import ResponseCache, cached_view
+from scan_jobs import FAILED
+from snapshot import SnapshotFollower, SnapshotRefresher
 
 app = Flask(__name__)
 
-# Load once at startup; for simplicity.
-# If you want dynamic reload, you can call load_apps() inside each route instead.
-APPS = load_apps()
+# Static files built by `python assets.py` are linked by content hash and
+# served gzip-compressed with immutable caching (see assets.py).
+init_assets(app)
+
+# Scan in the background: once at startup, every SPYSHIELD_RESCAN_INTERVAL
+# seconds (if set) and on POST /rescan, which returns a job to poll at
+# /scans/<id>. Pages are served from the start: while the first scan runs
+# they show the apps scored so far. Routes only ever read
+# REFRESHER.current, which is swapped atomically.
+# With SPYSHIELD_SNAPSHOT, startup maps the last saved snapshot instead of
+# scanning, and every rescan saves a new one.
+# With SPYSHIELD_ROLE=follower (multi-worker deployments, see
+# gunicorn.conf.py), this process never scans: it maps the snapshot file
+# that publisher.py writes and picks up each new generation from it.
+if os.environ.get("SPYSHIELD_ROLE") == "follower":
+    REFRESHER = SnapshotFollower(os.environ.get("SPYSHIELD_SNAPSHOT") or DEFAULT_SNAPSHOT_PATH)
+else:
+    REFRESHER = SnapshotRefresher(
+        interval=float(os.environ.get("SPYSHIELD_RESCAN_INTERVAL", "0") or 0),
+        snapshot_path=os.environ.get("SPYSHIELD_SNAPSHOT") or None,
+    )
+
+# Rendered pages are cached per snapshot generation (with ETags); a swap
+# to a new snapshot drops every cached page.
+RESPONSE_CACHE = ResponseCache()
+REFRESHER.add_listener(lambda snapshot: RESPONSE_CACHE.clear())
+
+if isinstance(REFRESHER, SnapshotRefresher):
+    if not REFRESHER.load_file():
+        REFRESHER.request_refresh("startup")
+    REFRESHER.start()
+
+# Blueprints and the cache read these through app.extensions.
+app.extensions["spyshield"] = REFRESHER
+app.extensions["spyshield_cache"] = RESPONSE_CACHE
+app.register_blueprint(api)
+
+
+def _collect_metrics():
+    yield from snapshot_samples(REFRESHER.current)
+    cache_figures = (
+        ("hits_total", "counter", "Rendered-page cache hits", RESPONSE_CACHE.hits),
+        ("misses_total", "counter", "Rendered-page cache misses", RESPONSE_CACHE.misses),
+        ("bytes", "gauge", "Bytes held by the rendered-page cache", RESPONSE_CACHE.size_bytes),
+    )
+    for suffix, kind, help, value in cache_figures:
+        yield Sample("spyshield_response_cache_" + suffix, kind, help, {}, value)
+
+
+# Snapshot and cache figures are read at scrape time, not tracked.
+METRICS.add_collector(_collect_metrics)
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def _first_scan_state(snapshot) -> Tuple[bool, Optional[str]]:
+    """
+    Until a scan has completed: (True, None) while one is queued or
+    running, or (False, error) once it has failed. (False, None) after.
+    """
+    if not (snapshot.partial or snapshot.generation == 0):
+        return False, None
+    jobs = getattr(REFRESHER, "jobs", None)
+    if jobs is None:
+        # Followers wait for the publisher's first snapshot, unless its
+        # scan failed (it keeps retrying)
+        error = REFRESHER.scan_error
+        return error is None, error
+    job = jobs.latest()
+    if job is not None and job.state == FAILED:
+        return False, job.error
+    return job is not None and not job.finished, None
 
 
 @app.route("/")
+@cached_view
 def index():
     """
-    Home page: list all apps with risk scores.
+    Home page: list apps by risk score, one page at a time.
+
+    Query args: level (High/Medium/Low), limit, offset. The ranking and
+    the per-level counts are precomputed per snapshot, so the cost of a
+    request depends on the page size, not the inventory size.
     """
-    # Convert dict -> list for template
-    apps_list = list(APPS.values())
+    snapshot = REFRESHER.current
 
-    # Sort by risk score descending
-    apps_list.sort(key=lambda x: x.get("risk_score", 0), reverse=True)
+    level = request.args.get("level", "").capitalize() or None
+    if level is not None and level not in RISK_LEVELS:
+        abort(400, description=f"Unknown risk level: {level}")
+    limit = request.args.get("limit", DEFAULT_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    offset = max(0, request.args.get("offset", 0, type=int))
 
-    return render_template("index.html", apps=apps_list)
+    total = snapshot.count(level)
+    apps = snapshot.page(level, offset, limit)
+    scan_pending, scan_error = _first_scan_state(snapshot)
+    with RENDER_SECONDS.time("index"):
+        html = render_template(
+            "index.html",
+            apps=apps,
+            total_apps=snapshot.count(),
+            level_counts=snapshot.level_counts,
+            level=level,
+            offset=offset,
+            limit=limit,
+            prev_offset=max(0, offset - limit) if offset > 0 else None,
+            next_offset=offset + limit if offset + limit < total else None,
+            scan_pending=scan_pending,
+            scan_error=scan_error,
+        )
+    response = make_response(html)
+    if snapshot.partial or snapshot.generation == 0:
+        # Depends on the scan job too, not just the snapshot generation
+        response.cache_control.no_store = True
+    return response
 
 
 @app.route("/app/<package_name>")
+@cached_view
 def app_detail(package_name: str):
     """
     Detail view for an individual app.
     """
-    app_info = APPS.get(package_name)
+    app_info = REFRESHER.current.apps.get(package_name)
     if not app_info:
         abort(404, description="App not found")
 
-    return render_template("app_detail.html", app=app_info)
+    with RENDER_SECONDS.time("app_detail"):
+        return render_template("app_detail.html", app=app_info)
+
+
+@app.route("/rescan", methods=["POST"])
+def rescan():
+    """
+    Queue a background rescan and return immediately. Concurrent requests
+    are coalesced into a single scan, whose job is returned to all of
+    them (followers hand the request to the publisher and return no job).
+    The Rescan button on the home page posts a form and is sent back there.
+    """
+    job = REFRESHER.request_refresh()
+    if request.form.get("from") == "page":
+        return redirect(url_for("index"), 303)
+    snapshot = REFRESHER.current
+    body = {
+        "queued": True,
+        "generation": snapshot.generation,
+        "scanning": REFRESHER.scanning,
+    }
+    headers = {}
+    if job is not None:
+        body["job"] = job.id
+        body["status_url"] = headers["Location"] = url_for("scan_status", job_id=job.id)
+    return jsonify(body), 202, headers
+
+
+@app.route("/scans/<job_id>")
+def scan_status(job_id: str):
+    """
+    State and progress of a scan job: queued/running/done/failed, apps
+    scored so far (and the total, when known up front) and the last
+    generation it published.
+    """
+    jobs = getattr(REFRESHER, "jobs", None)
+    job = jobs.get(job_id) if jobs is not None else None
+    if job is None:
+        abort(404, description="Scan not found")
+    return jsonify(job.to_dict())
+
+
+@app.route("/metrics")
+def metrics():
+    """
+    Stage timings, scan counters and snapshot figures in the Prometheus
+    text format. Not found when SPYSHIELD_METRICS=0.
+    """
+    if not METRICS.enabled:
+        abort(404)
+    return Response(METRICS.render(), mimetype="text/plain; version=0.0.4")
 
 
 if __name__ == "__main__":
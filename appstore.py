@@ -0,0 +1,338 @@
+# appstore.py
+#
+# Columnar (struct-of-arrays) storage for a scored inventory.
+# One array per field instead of one dict per app: numeric and boolean
+# columns live in compact array.array buffers, repeated strings are
+# stored once, and a package_name -> row index gives O(1) lookups.
+#
+# AppStore behaves like the old Dict[str, dict] returned by load_apps:
+# store[package_name] returns an AppRow, a read-only dict-like view that
+# templates and app.get("risk_score") style code can use unchanged.
+# Risk reasons are stored as reason codes (see models.risk_codes) and
+# only rendered to text when a row's "risk_reasons" is read.
+
+from array import array
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from models import AppInfo, render_reasons
+
+RISK_LEVELS: Tuple[str, ...] = ("Low", "Medium", "High")
+_LEVEL_CODES = {level: code for code, level in enumerate(RISK_LEVELS)}
+
+FLAG_FIELDS: Tuple[str, ...] = (
+    "is_system_app",
+    "has_launcher_icon",
+    "installed_from_play_store",
+    "uses_accessibility_service",
+    "uses_media_projection",
+    "has_overlay_permission",
+)
+USAGE_FIELDS: Tuple[str, ...] = (
+    "foreground_service_usage_score",
+    "background_network_usage_score",
+)
+# Optional display-only metadata passed through from the scanner.
+EXTRA_FIELDS: Tuple[str, ...] = ("publisher", "install_location")
+
+ROW_FIELDS: Tuple[str, ...] = (
+    ("package_name", "app_name", "permissions")
+    + FLAG_FIELDS
+    + USAGE_FIELDS
+    + ("risk_score", "risk_level", "risk_reasons")
+)
+
+
+class StringTable:
+    """
+    Append-only table of distinct strings; each value is stored once and
+    referenced by a small integer code. Code 0 is reserved for "absent".
+    """
+
+    def __init__(self) -> None:
+        self._codes: Dict[str, int] = {}
+        self._values: List[Optional[str]] = [None]
+
+    def __len__(self) -> int:
+        return len(self._values) - 1
+
+    def code(self, value: Optional[str]) -> int:
+        if value is None:
+            return 0
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self._values)
+            self._codes[value] = code
+            self._values.append(value)
+        return code
+
+    def value(self, code: int) -> Optional[str]:
+        return self._values[code]
+
+
+class AppRow(Mapping[str, Any]):
+    """
+    Lightweight read-only view of one AppStore row.
+
+    Values are read from the store's columns on access; nothing is copied.
+    Use to_dict() when a real, mutable dict is needed.
+    """
+
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store: "AppStore", row: int) -> None:
+        self._store = store
+        self._row = row
+
+    @property
+    def row(self) -> int:
+        return self._row
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._store.value(self._row, key)
+        if value is None and key in EXTRA_FIELDS:
+            # Absent extras are missing keys, as in the old dicts
+            raise KeyError(key)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        yield from ROW_FIELDS
+        for key in EXTRA_FIELDS:
+            if self._store.value(self._row, key) is not None:
+                yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"AppRow({self._store.package_name[self._row]!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        info = dict(self.items())
+        info["permissions"] = list(info["permissions"])
+        info["risk_reasons"] = list(info["risk_reasons"])
+        return info
+
+
+class AppStore(Mapping[str, AppRow]):
+    """
+    Scored inventory with one column per field, keyed by package_name.
+
+    Adding an app whose package_name is already present overwrites that
+    row in place, matching the old dict semantics (last one wins, first
+    position kept).
+    """
+
+    def __init__(self) -> None:
+        self._index: Dict[str, int] = {}
+        self.package_name: List[str] = []
+        self.app_name: List[str] = []
+        # Permission lists and reason code lists repeat a lot across apps,
+        # so each distinct tuple is stored once and shared between rows.
+        self.permissions: List[Tuple[str, ...]] = []
+        self.permission_mask: List[int] = []
+        self.risk_codes: List[Tuple[str, ...]] = []
+        self._shared_tuples: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+        # array('B') holding 0/1, one column per flag
+        self.flags: Dict[str, array] = {name: array("B") for name in FLAG_FIELDS}
+        self.usage: Dict[str, array] = {name: array("d") for name in USAGE_FIELDS}
+        self.risk_score = array("d")
+        self.risk_level = array("b")  # codes into RISK_LEVELS
+
+        self.strings = StringTable()
+        self.extras: Dict[str, array] = {name: array("I") for name in EXTRA_FIELDS}
+
+    # ---------- building ----------
+
+    def _shared(self, values: Sequence[str]) -> Tuple[str, ...]:
+        key = tuple(values)
+        return self._shared_tuples.setdefault(key, key)
+
+    def add(
+        self,
+        app: AppInfo,
+        score: float,
+        level: str,
+        codes: Sequence[str],
+        extras: Optional[Mapping[str, Any]] = None,
+    ) -> int:
+        """
+        Append (or overwrite) the scored app and return its row number.
+        `codes` are its reason codes, as returned by models.risk_codes.
+        """
+        extras = extras or {}
+        row = self._index.get(app.package_name)
+        if row is None:
+            row = len(self.package_name)
+            self._index[app.package_name] = row
+            self.package_name.append(app.package_name)
+            self.app_name.append(app.app_name)
+            self.permissions.append(self._shared(app.permissions))
+            self.permission_mask.append(app.permission_mask)
+            self.risk_codes.append(self._shared(codes))
+            for name, column in self.flags.items():
+                column.append(1 if getattr(app, name) else 0)
+            for name, column in self.usage.items():
+                column.append(getattr(app, name))
+            self.risk_score.append(score)
+            self.risk_level.append(_LEVEL_CODES[level])
+            for name, column in self.extras.items():
+                value = extras.get(name)
+                column.append(self.strings.code(None if value is None else str(value)))
+            return row
+
+        self.app_name[row] = app.app_name
+        self.permissions[row] = self._shared(app.permissions)
+        self.permission_mask[row] = app.permission_mask
+        self.risk_codes[row] = self._shared(codes)
+        for name, column in self.flags.items():
+            column[row] = 1 if getattr(app, name) else 0
+        for name, column in self.usage.items():
+            column[row] = getattr(app, name)
+        self.risk_score[row] = score
+        self.risk_level[row] = _LEVEL_CODES[level]
+        for name, column in self.extras.items():
+            value = extras.get(name)
+            column[row] = self.strings.code(None if value is None else str(value))
+        return row
+
+    def copy(self) -> "AppStore":
+        """
+        Independent store with the same rows, for publishing a consistent
+        view of a store that is still being built. Columns are copied; the
+        append-only string and tuple tables are shared.
+        """
+        other = AppStore.__new__(AppStore)
+        other._index = dict(self._index)
+        other.package_name = self.package_name[:]
+        other.app_name = self.app_name[:]
+        other.permissions = self.permissions[:]
+        other.permission_mask = self.permission_mask[:]
+        other.risk_codes = self.risk_codes[:]
+        other._shared_tuples = self._shared_tuples
+        other.flags = {name: column[:] for name, column in self.flags.items()}
+        other.usage = {name: column[:] for name, column in self.usage.items()}
+        other.risk_score = self.risk_score[:]
+        other.risk_level = self.risk_level[:]
+        other.strings = self.strings
+        other.extras = {name: column[:] for name, column in self.extras.items()}
+        return other
+
+    # ---------- reading ----------
+
+    def value(self, row: int, key: str) -> Any:
+        """Value of one field of one row, in the same form as the old dicts."""
+        if key in self.flags:
+            return bool(self.flags[key][row])
+        if key in self.usage:
+            return self.usage[key][row]
+        if key == "risk_score":
+            return self.risk_score[row]
+        if key == "risk_level":
+            return RISK_LEVELS[self.risk_level[row]]
+        if key in self.extras:
+            return self.strings.value(self.extras[key][row])
+        if key == "risk_reasons":
+            return render_reasons(self.risk_codes[row])
+        if key in ("package_name", "app_name", "permissions"):
+            return getattr(self, key)[row]
+        raise KeyError(key)
+
+    def row(self, row: int) -> AppRow:
+        return AppRow(self, row)
+
+    def rows(self) -> Iterator[AppRow]:
+        for row in range(len(self.package_name)):
+            yield AppRow(self, row)
+
+    def row_of(self, package_name: str) -> int:
+        """Row number of package_name, or -1 if absent."""
+        return self._index.get(package_name, -1)
+
+    def __getitem__(self, package_name: str) -> AppRow:
+        return AppRow(self, self._index[package_name])
+
+    def __contains__(self, package_name: object) -> bool:
+        return package_name in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.package_name)
+
+    def __len__(self) -> int:
+        return len(self.package_name)
+
+    # ---------- export ----------
+
+    def columns(self) -> Dict[str, Any]:
+        """
+        All columns by name. Numeric and flag columns are memoryviews over
+        the store's own buffers (no copy); string columns are the lists.
+        """
+        cols: Dict[str, Any] = {
+            "package_name": self.package_name,
+            "app_name": self.app_name,
+            "permissions": self.permissions,
+        }
+        for name, column in self.flags.items():
+            cols[name] = memoryview(column)
+        for name, column in self.usage.items():
+            cols[name] = memoryview(column)
+        cols["risk_score"] = memoryview(self.risk_score)
+        cols["risk_level"] = memoryview(self.risk_level)
+        cols["risk_codes"] = self.risk_codes
+        return cols
+
+    def to_pandas(self):
+        """
+        Build a pandas DataFrame. Numeric, flag and risk_level columns wrap
+        the store's buffers without copying (risk_level as a Categorical
+        over the shared codes); string columns are converted to objects.
+
+        While such a frame is alive the store cannot grow, because the
+        underlying arrays are exported.
+        """
+        import numpy as np
+        import pandas as pd
+
+        data: Dict[str, Any] = {
+            "package_name": self.package_name,
+            "app_name": self.app_name,
+        }
+        for name, column in self.flags.items():
+            data[name] = np.frombuffer(column, dtype=np.bool_)
+        for name, column in self.usage.items():
+            data[name] = np.frombuffer(column, dtype=np.float64)
+        data["risk_score"] = np.frombuffer(self.risk_score, dtype=np.float64)
+        data["risk_level"] = pd.Categorical.from_codes(
+            np.frombuffer(self.risk_level, dtype=np.int8), categories=list(RISK_LEVELS)
+        )
+        for name, column in self.extras.items():
+            data[name] = [self.strings.value(code) for code in column]
+        return pd.DataFrame(data, copy=False)
+
+    def to_arrow(self):
+        """
+        Build a pyarrow Table. Float columns are zero-copy views; risk_level
+        is a DictionaryArray over the shared codes. Arrow packs booleans into
+        bits, so flag columns are converted.
+        """
+        import numpy as np
+        import pyarrow as pa
+
+        arrays: Dict[str, Any] = {
+            "package_name": pa.array(self.package_name, type=pa.string()),
+            "app_name": pa.array(self.app_name, type=pa.string()),
+        }
+        for name, column in self.flags.items():
+            arrays[name] = pa.array(np.frombuffer(column, dtype=np.bool_))
+        for name, column in self.usage.items():
+            arrays[name] = pa.array(np.frombuffer(column, dtype=np.float64))
+        arrays["risk_score"] = pa.array(np.frombuffer(self.risk_score, dtype=np.float64))
+        arrays["risk_level"] = pa.DictionaryArray.from_arrays(
+            pa.array(np.frombuffer(self.risk_level, dtype=np.int8)), list(RISK_LEVELS)
+        )
+        for name, column in self.extras.items():
+            arrays[name] = pa.array(
+                [self.strings.value(code) for code in column], type=pa.string()
+            )
+        return pa.table(arrays)
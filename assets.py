@@ -0,0 +1,195 @@
+# assets.py
+#
+# Build step for the Flask app's static files:
+#
+#   python assets.py [static_dir]
+#
+# Each file under static/ (style.css, ...) gets a copy named after a hash
+# of its content (style.3f2a9c1d0b4e.css), minified if it is CSS, plus a
+# gzip-compressed variant when that is smaller. static/assets.json maps
+# the original names to the fingerprinted ones.
+#
+# init_assets(app) then makes url_for("static", filename="style.css")
+# return the fingerprinted URL and serves those files with
+# Cache-Control: immutable and the .gz variant to clients that accept
+# gzip. Editing a file changes its URL, so repeat visits never download
+# an asset twice and never see a stale one. Without a manifest (or for
+# files changed since the build) static files are served as before.
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import sys
+from typing import Dict, NamedTuple, Optional
+
+MANIFEST_NAME = "assets.json"
+HASH_LENGTH = 12
+# One year: the longest max-age browsers honour
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# Only worth compressing when it saves at least this fraction
+_MIN_GZIP_SAVING = 0.1
+_COMPRESSIBLE = ("text/", "application/javascript", "application/json", "image/svg+xml")
+_FINGERPRINTED = re.compile(r"\.[0-9a-f]{%d}(\.[^./]+)?(\.gz)?$" % HASH_LENGTH)
+
+# CSS strings and comments; only the text between them is rewritten
+_CSS_TOKENS = re.compile(r"(\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*')|/\*.*?\*/", re.S)
+
+
+class Asset(NamedTuple):
+    path: str  # fingerprinted file name, relative to the static folder
+    source_sha256: str  # of the original, to spot edits made after the build
+    mimetype: str
+    gzip: bool
+
+
+def minify_css(css: str) -> str:
+    """
+    Drop comments and redundant whitespace from CSS. Strings are kept
+    verbatim; spaces are only removed next to { } ; , and after a colon,
+    so selectors like "a :hover" keep their meaning.
+    """
+    parts = []
+    pos = 0
+    for match in _CSS_TOKENS.finditer(css):
+        parts.append(_squeeze(css[pos : match.start()]))
+        if match.group(1):  # a string, not a comment
+            parts.append(match.group(1))
+        pos = match.end()
+    parts.append(_squeeze(css[pos:]))
+    return "".join(parts).strip()
+
+
+def _squeeze(text: str) -> str:
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r" ?([{};,]) ?", r"\1", text)
+    text = re.sub(r": ", ":", text)
+    return text.replace(";}", "}")
+
+
+def _sha256(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _compressible(mimetype: str) -> bool:
+    return mimetype.startswith(_COMPRESSIBLE)
+
+
+def build_assets(static_folder: str) -> Dict[str, Asset]:
+    """
+    Write the fingerprinted (and gzip) copies of every file in
+    static_folder and the manifest. Earlier fingerprinted copies are
+    left in place for pages still referencing them.
+    """
+    manifest: Dict[str, Asset] = {}
+    for dirpath, _, filenames in os.walk(static_folder):
+        for filename in sorted(filenames):
+            if filename == MANIFEST_NAME or _FINGERPRINTED.search(filename):
+                continue
+            source = os.path.join(dirpath, filename)
+            name = os.path.relpath(source, static_folder).replace(os.sep, "/")
+            with open(source, "rb") as f:
+                data = f.read()
+            source_sha256 = hashlib.sha256(data).hexdigest()
+            mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+            if mimetype == "text/css":
+                data = minify_css(data.decode("utf-8")).encode("utf-8")
+
+            stem, ext = os.path.splitext(name)
+            path = f"{stem}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{ext}"
+            target = os.path.join(static_folder, path)
+            with open(target, "wb") as f:
+                f.write(data)
+
+            compressed = False
+            if _compressible(mimetype):
+                # mtime=0 keeps the output byte-identical across builds
+                packed = gzip.compress(data, compresslevel=9, mtime=0)
+                if len(packed) <= len(data) * (1 - _MIN_GZIP_SAVING):
+                    with open(target + ".gz", "wb") as f:
+                        f.write(packed)
+                    compressed = True
+
+            manifest[name] = Asset(path, source_sha256, mimetype, compressed)
+
+    with open(os.path.join(static_folder, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump({name: asset._asdict() for name, asset in manifest.items()}, f, indent=2)
+    return manifest
+
+
+def load_manifest(static_folder: str) -> Dict[str, Asset]:
+    """
+    The built assets whose source is unchanged since the build ({} when
+    there is no manifest).
+    """
+    try:
+        with open(os.path.join(static_folder, MANIFEST_NAME), encoding="utf-8") as f:
+            raw = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    manifest: Dict[str, Asset] = {}
+    for name, entry in raw.items():
+        asset = Asset(**entry)
+        source = os.path.join(static_folder, name)
+        if not os.path.exists(source) or _sha256(source) != asset.source_sha256:
+            print(f"[SpyShield] {name} changed since the asset build; serving it unversioned.")
+            continue
+        manifest[name] = asset
+    return manifest
+
+
+def init_assets(app, static_folder: Optional[str] = None) -> Dict[str, Asset]:
+    """
+    Serve the fingerprinted assets built for app's static folder (see the
+    module comment). Returns the manifest in use.
+    """
+    from flask import request, send_from_directory
+
+    static_folder = static_folder or app.static_folder
+    manifest = load_manifest(static_folder) if static_folder else {}
+    if not manifest:
+        return manifest
+    by_path = {asset.path: asset for asset in manifest.values()}
+
+    @app.url_defaults
+    def _fingerprint(endpoint: str, values: dict) -> None:
+        if endpoint == "static":
+            asset = manifest.get(values.get("filename"))
+            if asset is not None:
+                values["filename"] = asset.path
+
+    default_view = app.view_functions["static"]
+
+    def static(filename: str):
+        asset = by_path.get(filename)
+        if asset is None:
+            return default_view(filename=filename)
+        compressed = asset.gzip and request.accept_encodings["gzip"] > 0
+        response = send_from_directory(
+            static_folder,
+            filename + ".gz" if compressed else filename,
+            mimetype=asset.mimetype,
+            max_age=IMMUTABLE_MAX_AGE,
+        )
+        if compressed:
+            response.content_encoding = "gzip"
+        response.vary.add("Accept-Encoding")
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+    app.view_functions["static"] = static
+    return manifest
+
+
+if __name__ == "__main__":
+    folder = sys.argv[1] if len(sys.argv) > 1 else os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "static"
+    )
+    for name, asset in build_assets(folder).items():
+        print(f"[SpyShield] {name} -> {asset.path}" + (" (+ .gz)" if asset.gzip else ""))
@@ -0,0 +1,725 @@
+# bench.py
+#
+# Small benchmark harness for SpyShield's scoring paths.
+# Usage: python bench.py BENCHMARK [--sizes N ...] [--seed 0]  (names in BENCHMARKS)
+#
+# `python bench.py suite` times the whole pipeline end to end (scoring,
+# loading, registry mapping, Flask routes, Streamlit table) on seeded
+# synthetic inventories and can write the results as JSON (--json OUT);
+# pass an earlier results file as --baseline to print the ratios.
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, TextIO
+
+from models import AppInfo, PERMISSION_WEIGHTS, compute_risk, render_reasons, risk_codes
+
+# Permissions that are common but carry no weight, mixed in for realism.
+BENIGN_PERMISSIONS = [
+    "android.permission.INTERNET",
+    "android.permission.ACCESS_NETWORK_STATE",
+    "android.permission.WAKE_LOCK",
+    "android.permission.VIBRATE",
+    "android.permission.POST_NOTIFICATIONS",
+]
+
+
+def synthetic_apps(n: int, seed: int = 0) -> List[AppInfo]:
+    """
+    Generate n random AppInfo records, reproducibly for a given seed.
+    """
+    rng = random.Random(seed)
+    weighted = list(PERMISSION_WEIGHTS)
+    apps: List[AppInfo] = []
+    for i in range(n):
+        perms = rng.sample(BENIGN_PERMISSIONS, rng.randint(1, 3))
+        perms += rng.sample(weighted, rng.choice((0, 0, 1, 2, 4)))
+        apps.append(
+            AppInfo(
+                package_name=f"com.synthetic.app{i}",
+                app_name=f"Synthetic App {i}",
+                permissions=perms,
+                is_system_app=rng.random() < 0.15,
+                has_launcher_icon=rng.random() < 0.9,
+                installed_from_play_store=rng.random() < 0.8,
+                uses_accessibility_service=rng.random() < 0.05,
+                uses_media_projection=rng.random() < 0.05,
+                has_overlay_permission=rng.random() < 0.08,
+                foreground_service_usage_score=round(rng.random(), 2),
+                background_network_usage_score=round(rng.random(), 2),
+            )
+        )
+    return apps
+
+
+SYNTHETIC_PUBLISHERS = [
+    "Microsoft Corporation",
+    "Google LLC",
+    "Adobe",
+    "NVIDIA Corporation",
+    "Contoso Ltd.",
+    "Fabrikam, Inc.",
+    "",
+]
+SYNTHETIC_PRODUCT_WORDS = [
+    "Remote", "Viewer", "Studio", "Runtime", "Driver", "Monitor", "Office",
+    "Screen", "Sync", "Tools", "Helper", "Player", "Update", "Assistant",
+]
+
+
+def synthetic_registry(n: int, seed: int = 0, latency: float = 0.0):
+    """
+    A FakeRegistry with n uninstall entries spread over the UNINSTALL_KEYS
+    hives, including entries without DisplayName and cross-hive duplicates.
+    """
+    from fake_winreg import FakeRegistry
+    from scanner_windows import UNINSTALL_KEYS
+
+    rng = random.Random(seed)
+    reg = FakeRegistry()
+    for i in range(n):
+        root, path = UNINSTALL_KEYS[rng.choice((0, 0, 0, 1, 2, 2))]
+        values = {}
+        if rng.random() < 0.9:
+            words = rng.sample(SYNTHETIC_PRODUCT_WORDS, 2)
+            # Reuse names now and then so the same app shows up in two hives
+            values["DisplayName"] = f"{words[0]} {words[1]} {rng.randint(1, max(1, n // 3))}"
+            values["Publisher"] = rng.choice(SYNTHETIC_PUBLISHERS)
+            if rng.random() < 0.7:
+                values["InstallLocation"] = rf"C:\Program Files\Vendor{i % 97}\App{i}"
+        name = f"{{{rng.getrandbits(64):016X}-{i:08d}}}"
+        reg.set_values(root, path + "\\" + name, **values)
+    reg.latency = latency
+    return reg
+
+
+# Install profiles for synthetic_app_dicts: share of apps, then the
+# probability of each flag, and how many weighted permissions to draw.
+APP_PROFILES: Dict[str, Dict[str, Any]] = {
+    "store": dict(
+        share=0.62, store=1.0, system=0.0, launcher=0.97, accessibility=0.02,
+        projection=0.03, overlay=0.05, risky=(0, 0, 0, 1, 1, 2), background=(2, 5),
+    ),
+    "system": dict(
+        share=0.23, store=0.0, system=1.0, launcher=0.25, accessibility=0.05,
+        projection=0.02, overlay=0.08, risky=(0, 0, 1, 2), background=(2, 6),
+    ),
+    "sideloaded": dict(
+        share=0.12, store=0.0, system=0.0, launcher=0.8, accessibility=0.2,
+        projection=0.15, overlay=0.3, risky=(1, 2, 3, 4, 5), background=(3, 4),
+    ),
+    "stalkerware": dict(
+        share=0.03, store=0.0, system=0.0, launcher=0.2, accessibility=0.9,
+        projection=0.6, overlay=0.8, risky=(4, 5, 6, 7), background=(5, 2),
+    ),
+}
+
+
+def synthetic_app_dicts(n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    n realistic AppInfo dicts (as load_apps reads them), reproducibly for a
+    given seed. Each app follows an install profile, so flags, permissions
+    and usage are correlated the way they are on real devices: sideloaded
+    apps hold more dangerous permissions, stalkerware hides its launcher
+    icon and uses accessibility, overlays and lots of background network.
+    """
+    rng = random.Random(seed)
+    weighted = list(PERMISSION_WEIGHTS)
+    names = list(APP_PROFILES)
+    shares = [APP_PROFILES[name]["share"] for name in names]
+    apps: List[Dict[str, Any]] = []
+    for i in range(n):
+        kind = rng.choices(names, shares)[0]
+        profile = APP_PROFILES[kind]
+        perms = rng.sample(BENIGN_PERMISSIONS, rng.randint(1, 4))
+        perms += rng.sample(weighted, rng.choice(profile["risky"]))
+        words = rng.sample(SYNTHETIC_PRODUCT_WORDS, 2)
+        app: Dict[str, Any] = {
+            "package_name": f"com.{kind}.app{i}",
+            "app_name": f"{words[0]} {words[1]} {i}",
+            "permissions": perms,
+            "is_system_app": rng.random() < profile["system"],
+            "has_launcher_icon": rng.random() < profile["launcher"],
+            "installed_from_play_store": rng.random() < profile["store"],
+            "uses_accessibility_service": rng.random() < profile["accessibility"],
+            "uses_media_projection": rng.random() < profile["projection"],
+            "has_overlay_permission": rng.random() < profile["overlay"],
+            "foreground_service_usage_score": round(rng.betavariate(2, 5), 2),
+            "background_network_usage_score": round(rng.betavariate(*profile["background"]), 2),
+        }
+        if rng.random() < 0.6:
+            app["publisher"] = rng.choice(SYNTHETIC_PUBLISHERS) or "Unknown developer"
+        apps.append(app)
+    return apps
+
+
+def synthetic_registry_entries(n: int, seed: int = 0) -> List[Dict[str, str]]:
+    """
+    n raw uninstall entries, shaped like the scanner's registry reads (the
+    input of _to_appinfo_dict), with a few remote-access style names.
+    """
+    from scanner_windows import SUSPICIOUS_KEYWORDS
+
+    rng = random.Random(seed)
+    entries: List[Dict[str, str]] = []
+    for i in range(n):
+        words = rng.sample(SYNTHETIC_PRODUCT_WORDS, 2)
+        if rng.random() < 0.04:
+            words[0] = rng.choice(SUSPICIOUS_KEYWORDS).title()
+        entries.append(
+            {
+                "registry_key": f"{{{rng.getrandbits(64):016X}-{i:08d}}}",
+                "app_name": f"{words[0]} {words[1]} {i}",
+                "publisher": rng.choice(SYNTHETIC_PUBLISHERS),
+                "install_location": (
+                    rf"C:\Program Files\Vendor{i % 97}\App{i}" if rng.random() < 0.7 else ""
+                ),
+            }
+        )
+    return entries
+
+
+def _best_of(fn: Callable[[], object], repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_reasons(sizes: List[int], seed: int) -> None:
+    """
+    compute_risk (formatted reasons) against the score-only risk_codes,
+    and the cost of rendering one app's reasons on demand.
+    """
+    print(
+        f"{'apps':>9} {'compute_risk':>13} {'risk_codes':>11} {'speedup':>8} "
+        f"{'text MB':>8} {'codes MB':>9} {'render/app':>11}"
+    )
+    for n in sizes:
+        apps = synthetic_apps(n, seed)
+        for app in apps[:1000]:
+            score, level, codes = risk_codes(app)
+            assert (score, level, list(render_reasons(tuple(codes)))) == compute_risk(app)
+
+        text_mb = _traced_bytes(lambda: [compute_risk(a) for a in apps]) / 1e6
+        codes_mb = _traced_bytes(lambda: [risk_codes(a) for a in apps]) / 1e6
+        t_text = _best_of(lambda: [compute_risk(a) for a in apps], repeat=1)
+        t_codes = _best_of(lambda: [risk_codes(a) for a in apps], repeat=1)
+        sample = [tuple(risk_codes(a)[2]) for a in apps[:1000]]
+        render_reasons.cache_clear()
+        t_render = _best_of(lambda: [render_reasons(c) for c in sample], repeat=1) / len(sample)
+        print(
+            f"{n:>9} {t_text:>12.3f}s {t_codes:>10.3f}s {t_text / t_codes:>7.1f}x "
+            f"{text_mb:>8.1f} {codes_mb:>9.1f} {t_render * 1e6:>9.1f}us"
+        )
+
+
+def _traced_bytes(build: Callable[[], object]) -> int:
+    tracemalloc.start()
+    try:
+        return _traced_now(build())
+    finally:
+        tracemalloc.stop()
+
+
+def _traced_now(result: object) -> int:
+    # Takes the built object so it is still alive while being measured
+    return tracemalloc.get_traced_memory()[0]
+
+
+def bench_permissions(sizes: List[int], seed: int) -> None:
+    """
+    Per-app permission memory and a two-permission AND query (list scan vs
+    PermissionIndex). Memory is what each representation actually holds:
+    JSON-decoded string lists (one string object per listing), AppInfo's
+    interned list plus mask, and AppStore's shared tuple plus mask columns.
+    """
+    from appstore import AppStore
+    from permissions import PERMISSIONS, PermissionIndex, iter_bits
+
+    def build_infos(lists):
+        return [AppInfo(package_name="", app_name="", permissions=p) for p in lists]
+
+    def build_columns(lists):
+        store = AppStore()
+        for perms in lists:
+            store.permissions.append(store._shared(perms))
+            store.permission_mask.append(PERMISSIONS.mask(perms))
+        return store
+
+    wanted = ("android.permission.READ_SMS", "android.permission.RECORD_AUDIO")
+    print(
+        f"{'apps':>9} {'lists B/app':>12} {'AppInfo B/app':>14} {'store B/app':>12} "
+        f"{'scan':>9} {'index':>9}"
+    )
+    for n in sizes:
+        apps = synthetic_apps(n, seed)
+        # Round-trip through JSON so every string is its own object, as in
+        # a real inventory file.
+        encoded = json.dumps([a.permissions for a in apps])
+        list_bytes = _traced_bytes(lambda: json.loads(encoded))
+        lists = json.loads(encoded)
+        # AppInfo's share of permission memory: the same records with and
+        # without permissions, so the dataclass itself cancels out.
+        info_bytes = _traced_bytes(lambda: build_infos(lists)) - _traced_bytes(
+            lambda: build_infos([[] for _ in lists])
+        )
+        store_bytes = _traced_bytes(lambda: build_columns([a.permissions for a in apps]))
+        index = PermissionIndex(a.permission_mask for a in apps)
+        index.rows_with_all(*wanted)  # build the columns once
+
+        t_scan = _best_of(
+            lambda: [i for i, p in enumerate(lists) if wanted[0] in p and wanted[1] in p]
+        )
+        t_index = _best_of(lambda: list(iter_bits(index.rows_with_all(*wanted))))
+        print(
+            f"{n:>9} {list_bytes / n:>12.1f} {info_bytes / n:>14.1f} {store_bytes / n:>12.1f} "
+            f"{t_scan:>8.4f}s {t_index:>8.4f}s"
+        )
+
+
+def bench_store(sizes: List[int], seed: int) -> None:
+    """
+    Memory and build time of the old dict-of-dicts inventory against AppStore.
+    """
+    from appstore import AppStore
+
+    def build_dicts(scored):
+        apps = {}
+        for app, (score, level, reasons) in scored:
+            info = app.to_dict()
+            info["risk_score"] = score
+            info["risk_level"] = level
+            info["risk_reasons"] = reasons
+            apps[app.package_name] = info
+        return apps
+
+    def build_store(scored):
+        store = AppStore()
+        for app, (score, level, codes) in scored:
+            store.add(app, score, level, codes)
+        return store
+
+    print(f"{'apps':>9} {'dict MB':>9} {'store MB':>9} {'dict build':>11} {'store build':>12}")
+    for n in sizes:
+        apps = synthetic_apps(n, seed)
+        # Fresh reason lists per app, as compute_risk produces them; the
+        # store keeps reason codes, as the ingest pipeline does.
+        scored = [(a, compute_risk(a)) for a in apps]
+        scored_codes = [(a, risk_codes(a)) for a in apps]
+        dict_mb = _traced_bytes(lambda: build_dicts(scored)) / 1e6
+        store_mb = _traced_bytes(lambda: build_store(scored_codes)) / 1e6
+        t_dicts = _best_of(lambda: build_dicts(scored), repeat=1)
+        t_store = _best_of(lambda: build_store(scored_codes), repeat=1)
+        print(f"{n:>9} {dict_mb:>9.1f} {store_mb:>9.1f} {t_dicts:>10.3f}s {t_store:>11.3f}s")
+
+
+def bench_registry(sizes: List[int], seed: int) -> None:
+    """
+    Serial vs thread-pool registry enumeration against a FakeRegistry with
+    50 microseconds of simulated latency per registry call.
+    """
+    from scanner_windows import get_installed_apps_windows
+
+    print(f"{'entries':>9} {'apps':>7} {'serial':>9} {'parallel':>9} {'speedup':>8}")
+    for n in sizes:
+        reg = synthetic_registry(n, seed, latency=0.00005)
+        serial_result = get_installed_apps_windows(reg=reg, max_workers=1)
+        assert get_installed_apps_windows(reg=reg) == serial_result
+        t_serial = _best_of(lambda: get_installed_apps_windows(reg=reg, max_workers=1), repeat=1)
+        t_parallel = _best_of(lambda: get_installed_apps_windows(reg=reg), repeat=1)
+        print(
+            f"{n:>9} {len(serial_result):>7} {t_serial:>8.3f}s {t_parallel:>8.3f}s "
+            f"{t_serial / t_parallel:>7.1f}x"
+        )
+
+
+def bench_registry_rescan(sizes: List[int], seed: int) -> None:
+    """
+    Registry calls for a full scan vs a rescan with RegistryScanCache, on
+    an unchanged FakeRegistry and after touching ~1% of the entries.
+    """
+    from scanner_windows import UNINSTALL_KEYS, RegistryScanCache, get_installed_apps_windows
+
+    print(f"{'entries':>9} {'full calls':>11} {'rescan calls':>13} {'1% changed':>11}")
+    for n in sizes:
+        reg = synthetic_registry(n, seed)
+        cache = RegistryScanCache()
+        full = get_installed_apps_windows(reg=reg, max_workers=1)
+
+        reg.reset_calls()
+        get_installed_apps_windows(reg=reg, max_workers=1)
+        full_calls = sum(reg.calls.values())
+
+        get_installed_apps_windows(reg=reg, max_workers=1, cache=cache)  # prime
+        reg.reset_calls()
+        assert get_installed_apps_windows(reg=reg, max_workers=1, cache=cache) == full
+        rescan_calls = sum(reg.calls.values())
+
+        root, path = UNINSTALL_KEYS[0]
+        touched = list(cache.hives[RegistryScanCache.hive_id(root, path)])[::50]
+        for name in touched:
+            reg.set_values(root, path + "\\" + name, DisplayName=f"Changed {name}")
+        reg.reset_calls()
+        get_installed_apps_windows(reg=reg, max_workers=1, cache=cache)
+        assert cache.read == len(touched)
+        print(
+            f"{n:>9} {full_calls:>11} {rescan_calls:>13} "
+            f"{sum(reg.calls.values()):>11} (read {cache.read}, reused {cache.reused})"
+        )
+
+
+def write_synthetic_fleet(directory: str, devices: int, apps_per_device: int = 40, seed: int = 0):
+    """
+    One gzipped JSONL inventory per device, drawn from a shared catalogue
+    so the same apps recur across devices as they do in a real fleet.
+    """
+    import gzip
+    import os
+
+    rng = random.Random(seed)
+    catalogue = [json.dumps(a.to_dict()) for a in synthetic_apps(2000, seed)]
+    os.makedirs(directory, exist_ok=True)
+    for d in range(devices):
+        with gzip.open(os.path.join(directory, f"device-{d:06d}.jsonl.gz"), "wt") as f:
+            f.write("\n".join(rng.sample(catalogue, apps_per_device)))
+
+
+def bench_memo(sizes: List[int], seed: int) -> None:
+    """
+    compute_risk vs RiskMemo on a fleet-like workload: n app records drawn
+    from a 2000-app catalogue with usage scores jittered per device.
+    Memory is what the resulting reason lists/tuples keep alive.
+    """
+    from models import RiskMemo
+
+    catalogue = synthetic_apps(2000, seed)
+    rng = random.Random(seed)
+    print(
+        f"{'records':>9} {'compute_risk':>13} {'memo':>9} {'hit rate':>9} "
+        f"{'reasons MB':>11} {'memo MB':>8}"
+    )
+    for n in sizes:
+        records = []
+        for _ in range(n):
+            base = rng.choice(catalogue)
+            records.append(
+                AppInfo(
+                    package_name=base.package_name,
+                    app_name=base.app_name,
+                    permissions=base.permissions,
+                    is_system_app=base.is_system_app,
+                    has_launcher_icon=base.has_launcher_icon,
+                    installed_from_play_store=base.installed_from_play_store,
+                    uses_accessibility_service=base.uses_accessibility_service,
+                    uses_media_projection=base.uses_media_projection,
+                    has_overlay_permission=base.has_overlay_permission,
+                    foreground_service_usage_score=round(rng.random(), 2),
+                    background_network_usage_score=round(rng.random(), 2),
+                )
+            )
+
+        memo = RiskMemo()
+        for app in records[:1000]:
+            assert memo.score(app)[:2] == compute_risk(app)[:2]
+            assert list(render_reasons(memo.score(app)[2])) == compute_risk(app)[2]
+
+        memo = RiskMemo()
+        plain_mb = _traced_bytes(lambda: [compute_risk(a) for a in records]) / 1e6
+        memo_mb = _traced_bytes(lambda: [memo.score(a) for a in records]) / 1e6
+        hit_rate = memo.hits / max(1, memo.hits + memo.misses)
+        t_plain = _best_of(lambda: [compute_risk(a) for a in records], repeat=1)
+        t_memo = _best_of(lambda: [memo.score(a) for a in records], repeat=1)
+        print(
+            f"{n:>9} {t_plain:>12.3f}s {t_memo:>8.3f}s {hit_rate:>8.1%} "
+            f"{plain_mb:>11.1f} {memo_mb:>8.1f}"
+        )
+
+
+def bench_fleet(sizes: List[int], seed: int) -> None:
+    """
+    fleet.score_fleet on a synthetic corpus (sizes are device counts),
+    in-process vs one worker process per core.
+    """
+    import os
+    import tempfile
+
+    from fleet import score_fleet
+
+    cores = os.cpu_count() or 1
+    print(f"{'devices':>9} {'apps':>9} {'1 worker':>9} {f'{cores} workers':>11} {'devices/s':>10}")
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            write_synthetic_fleet(directory, n, seed=seed)
+            serial = score_fleet(directory, workers=1)
+            parallel = score_fleet(directory, workers=cores)
+            assert parallel.level_counts == serial.level_counts
+            print(
+                f"{n:>9} {serial.total_apps:>9} {serial.elapsed_seconds:>8.2f}s "
+                f"{parallel.elapsed_seconds:>10.2f}s {n / parallel.elapsed_seconds:>10.0f}"
+            )
+
+
+def bench_snapshot_file(sizes: List[int], seed: int) -> None:
+    """
+    Startup from a saved snapshot file (mmap) against building the
+    snapshot from scored apps; plus the first page and a lookup on it.
+    """
+    import os
+    import tempfile
+
+    from appstore import AppStore
+    from snapshot import Snapshot
+    from snapshot_file import load_snapshot_file, snapshot_data_path, write_snapshot_file
+
+    print(
+        f"{'apps':>9} {'build':>9} {'write':>9} {'file MB':>8} "
+        f"{'map':>9} {'page+get':>9}"
+    )
+    for n in sizes:
+        scored = [(a, risk_codes(a)) for a in synthetic_apps(n, seed)]
+
+        def build() -> Snapshot:
+            store = AppStore()
+            for app, (score, level, codes) in scored:
+                store.add(app, score, level, codes)
+            return Snapshot(generation=1, apps=store, built_at=time.time(), scan_seconds=0.0)
+
+        start = time.perf_counter()
+        snapshot = build()
+        t_build = time.perf_counter() - start
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "inventory.snap")
+            start = time.perf_counter()
+            write_snapshot_file(snapshot, path)
+            t_write = time.perf_counter() - start
+
+            t_map = _best_of(lambda: load_snapshot_file(path))
+            mapped = load_snapshot_file(path)
+            last = f"com.synthetic.app{n - 1}"
+            t_use = _best_of(
+                lambda m=mapped: (m.page("High", 0, 100), m.apps[last]["risk_score"])
+            )
+            assert mapped.apps[last].to_dict() == snapshot.apps[last].to_dict()
+            print(
+                f"{n:>9} {t_build:>8.3f}s {t_write:>8.3f}s {os.path.getsize(snapshot_data_path(path)) / 1e6:>8.1f} "
+                f"{t_map * 1000:>7.2f}ms {t_use * 1000:>7.2f}ms"
+            )
+            del mapped
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+@contextlib.contextmanager
+def _environ(**values: str):
+    saved = {name: os.environ.get(name) for name in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def _flask_client(store):
+    """Test client for app.py serving `store`, with the response cache off."""
+    import tempfile
+
+    # As a follower of a snapshot that never appears, importing app.py
+    # starts no refresher thread and no startup scan during the timings.
+    with tempfile.TemporaryDirectory() as directory, _environ(
+        SPYSHIELD_ROLE="follower", SPYSHIELD_SNAPSHOT=os.path.join(directory, "none.snap")
+    ), contextlib.redirect_stdout(io.StringIO()):
+        import app as webapp
+    from snapshot import SnapshotRefresher
+
+    refresher = SnapshotRefresher(loader=lambda progress=None: store)
+    refresher.refresh_now()
+    webapp.REFRESHER = refresher
+    webapp.app.extensions["spyshield"] = refresher
+    webapp.app.extensions.pop("spyshield_cache", None)
+    # Flattened checkouts keep the templates next to app.py
+    if not os.path.isdir(os.path.join(webapp.app.root_path, "templates")):
+        webapp.app.jinja_loader.searchpath.append(webapp.app.root_path)
+    return webapp.app.test_client(), refresher.current
+
+
+def run_suite(
+    sizes: List[int], seed: int, repeat: int = 3, out: Optional[TextIO] = None
+) -> Dict[str, Any]:
+    """
+    Time each pipeline stage at each size; returns a JSON-serializable
+    report. Times are the best of `repeat` runs. The table is printed to
+    `out` (stdout by default) as it is measured.
+    """
+    out = out or sys.stdout
+    import tempfile
+
+    from models import RISK_MEMO
+    from scanner_windows import _to_appinfo_dict
+    from storage import load_apps
+
+    results: List[Dict[str, Any]] = []
+
+    def record(name: str, size: int, seconds: float, items: int) -> None:
+        results.append(
+            {
+                "benchmark": name,
+                "size": size,
+                "items": items,
+                "seconds": seconds,
+                "us_per_item": seconds / max(1, items) * 1e6,
+            }
+        )
+        print(
+            f"{name:<22} {size:>9} {seconds:>10.4f}s {seconds / max(1, items) * 1e6:>12.2f}us",
+            file=out,
+        )
+
+    print(f"{'benchmark':<22} {'size':>9} {'best':>11} {'per item':>14}", file=out)
+    for n in sizes:
+        records = synthetic_app_dicts(n, seed)
+        apps = [AppInfo.from_dict(r) for r in records]
+        record("compute_risk", n, _best_of(lambda: [compute_risk(a) for a in apps], repeat), n)
+
+        entries = synthetic_registry_entries(n, seed)
+        record(
+            "_to_appinfo_dict",
+            n,
+            _best_of(lambda: [_to_appinfo_dict(e) for e in entries], repeat),
+            n,
+        )
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "inventory.jsonl")
+            with open(path, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(r) + "\n" for r in records)
+
+            def load():
+                RISK_MEMO.clear()  # time real scoring, not a warm memo
+                with contextlib.redirect_stdout(io.StringIO()):
+                    return load_apps(inventory_path=path)
+
+            record("load_apps", n, _best_of(load, repeat), n)
+            store = load()
+
+        client, snapshot = _flask_client(store)
+        requests = 50
+        routes = {
+            "flask_index": "/",
+            "flask_index_level": "/?level=High&offset=100",
+            "flask_app_detail": f"/app/{snapshot.page(limit=1)[0]['package_name']}" if n else "/",
+        }
+        for name, url in routes.items():
+            assert client.get(url).status_code == 200, url
+
+            def hit(url: str = url) -> None:
+                for _ in range(requests):
+                    client.get(url)
+
+            record(name, n, _best_of(hit, repeat), requests)
+
+        try:
+            from dashboard import filter_table, risk_table, table_window
+        except ImportError:  # pandas is only needed for the Streamlit app
+            continue
+        record("streamlit_table", n, _best_of(lambda: risk_table(snapshot), repeat), n)
+        table = risk_table(snapshot)
+
+        def window() -> None:
+            table_window(filter_table(table, level="High", search="app1"), 1)
+
+        record("streamlit_window", n, _best_of(window, repeat), n)
+
+    return {
+        "suite": "spyshield",
+        "seed": seed,
+        "repeat": repeat,
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def compare_results(
+    baseline: Dict[str, Any], current: Dict[str, Any], out: Optional[TextIO] = None
+) -> None:
+    """Print current/baseline time ratios for the benchmarks both runs have."""
+    out = out or sys.stdout
+    before = {(r["benchmark"], r["size"]): r["seconds"] for r in baseline["results"]}
+    print(f"\nvs baseline {baseline.get('commit') or '(unknown commit)'}:", file=out)
+    for r in current["results"]:
+        old = before.get((r["benchmark"], r["size"]))
+        if old:
+            print(f"{r['benchmark']:<22} {r['size']:>9} {r['seconds'] / old:>8.2f}x", file=out)
+
+
+BENCHMARKS = {
+    "permissions": bench_permissions,
+    "store": bench_store,
+    "registry": bench_registry,
+    "registry-rescan": bench_registry_rescan,
+    "fleet": bench_fleet,
+    "memo": bench_memo,
+    "reasons": bench_reasons,
+    "snapshot-file": bench_snapshot_file,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="SpyShield benchmarks")
+    parser.add_argument(
+        "bench", nargs="?", choices=sorted(BENCHMARKS) + ["suite"], default="suite"
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="suite: runs per timing")
+    parser.add_argument("--json", help="suite: write results here ('-' for stdout)")
+    parser.add_argument("--baseline", help="suite: earlier --json results to compare with")
+    args = parser.parse_args()
+    if args.bench != "suite":
+        BENCHMARKS[args.bench](args.sizes, args.seed)
+        return
+
+    # Keep stdout parseable when the JSON report goes there
+    out = sys.stderr if args.json == "-" else sys.stdout
+    report = run_suite(args.sizes, args.seed, args.repeat, out)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            compare_results(json.load(f), report, out)
+    if args.json == "-":
+        print(json.dumps(report, indent=2))
+    elif args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
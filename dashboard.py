@@ -0,0 +1,110 @@
+# dashboard.py
+#
+# Display helpers for the Streamlit dashboard, kept out of
+# streamlit_app.py (which runs as a script) so they can be imported by
+# benchmarks and other front ends.
+
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from appstore import RISK_LEVELS
+from snapshot import AnySnapshot
+from sqlite_store import SQLiteApps
+
+# Indexed by the installed_from_play_store flag
+SOURCE_LABELS: Tuple[str, ...] = ("Unknown / Sideloaded", "Trusted / Store")
+
+# Rows sent to the browser per table page
+TABLE_WINDOW = 500
+
+
+def source_label(app: Mapping[str, Any]) -> str:
+    return SOURCE_LABELS[bool(app.get("installed_from_play_store"))]
+
+
+def risk_table(snapshot: AnySnapshot) -> pd.DataFrame:
+    """
+    The apps table: one row per app, in ranking order. Built column-wise
+    from the inventory's buffers: names are Arrow strings, risk level and
+    source are categoricals over the stored codes and scores are rounded
+    in one vectorized step.
+    """
+    apps = snapshot.apps
+    if isinstance(apps, SQLiteApps):
+        # No column buffers to gather from: query just the shown columns.
+        cols = apps.ranked_columns(
+            ("app_name", "package_name", "risk_score", "risk_level", "installed_from_play_store")
+        )
+        names = pa.array(cols["app_name"], type=pa.string())
+        packages = pa.array(cols["package_name"], type=pa.string())
+        scores = np.array(cols["risk_score"], dtype=np.float64)
+        level_codes = {level: code for code, level in enumerate(RISK_LEVELS)}
+        levels = np.array([level_codes[level] for level in cols["risk_level"]], dtype=np.int8)
+        sources = np.array(cols["installed_from_play_store"], dtype=np.int8)
+    else:
+        # AppStore and MappedInventory: gather each column in ranking order
+        order = np.frombuffer(snapshot.ranking, dtype=np.uint32)
+        names = _strings(apps.app_name).take(order)
+        packages = _strings(apps.package_name).take(order)
+        scores = np.frombuffer(apps.risk_score, dtype=np.float64)[order]
+        levels = np.frombuffer(apps.risk_level, dtype=np.int8)[order]
+        sources = np.frombuffer(apps.flags["installed_from_play_store"], dtype=np.uint8)[order]
+
+    return pd.DataFrame(
+        {
+            "App": pd.arrays.ArrowExtensionArray(names),
+            "Package / ID": pd.arrays.ArrowExtensionArray(packages),
+            "Risk Score": scores.round(1),
+            "Risk Level": pd.Categorical.from_codes(levels, RISK_LEVELS, ordered=True),
+            "Source": pd.Categorical.from_codes(sources.astype(np.int8), SOURCE_LABELS),
+        },
+        copy=False,
+    )
+
+
+def _strings(column) -> pa.Array:
+    # AppStore keeps plain lists; mapped string columns decode on iteration.
+    return pa.array(column if isinstance(column, list) else list(column), type=pa.string())
+
+
+def filter_table(
+    table: pd.DataFrame,
+    level: Optional[str] = None,
+    source: Optional[str] = None,
+    search: str = "",
+) -> pd.DataFrame:
+    """
+    Rows of a risk_table matching a risk level, a source and a search
+    string (case-insensitive, in the app name or package), still in
+    ranking order. Each filter is one vectorized mask.
+    """
+    mask = np.ones(len(table), dtype=bool)
+    if level:
+        mask &= (table["Risk Level"] == level).to_numpy()
+    if source:
+        mask &= (table["Source"] == source).to_numpy()
+    if search:
+        mask &= (
+            table["App"].str.contains(search, case=False, regex=False)
+            | table["Package / ID"].str.contains(search, case=False, regex=False)
+        ).to_numpy(dtype=bool, na_value=False)
+    return table if mask.all() else table[mask]
+
+
+def table_window(table: pd.DataFrame, page: int, size: int = TABLE_WINDOW) -> pd.DataFrame:
+    """One page of rows (page numbers start at 1, clamped to the last page)."""
+    pages = max(1, -(-len(table) // size))
+    start = (min(max(page, 1), pages) - 1) * size
+    return table.iloc[start : start + size]
+
+
+def app_labels(table: pd.DataFrame) -> Tuple[Dict[str, str], List[str]]:
+    """Selector labels ("App (package)") -> package_name, and the sorted labels."""
+    label_to_pkg = {
+        f"{name} ({package})": package
+        for name, package in zip(table["App"].tolist(), table["Package / ID"].tolist())
+    }
+    return label_to_pkg, sorted(label_to_pkg.keys())
@@ -0,0 +1,154 @@
+# delta.py
+#
+# Scan-to-scan change detection.
+# diff_stores() compares two AppStore snapshots by package_name, column by
+# column, so unchanged apps cost a handful of value comparisons and no
+# per-row hashing during ingest.
+# ChangeFeed keeps the most recent deltas so consumers (dashboards, alerts,
+# exports) can catch up from a sequence number instead of re-reading the
+# whole inventory; GET /api/changes serves it (see api.py).
+
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from appstore import EXTRA_FIELDS, ROW_FIELDS, AppStore
+
+# Fields compared for modified apps (risk_reasons follow from the rest).
+_DIFF_FIELDS = tuple(f for f in ROW_FIELDS if f not in ("package_name", "risk_reasons")) + (
+    EXTRA_FIELDS
+)
+
+
+@dataclass
+class AppChange:
+    package_name: str
+    changes: Dict[str, Tuple[Any, Any]]  # field -> (old, new)
+    old_score: float
+    new_score: float
+
+    @property
+    def score_delta(self) -> float:
+        return self.new_score - self.old_score
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "package_name": self.package_name,
+            "changes": {k: [old, new] for k, (old, new) in self.changes.items()},
+            "old_score": self.old_score,
+            "new_score": self.new_score,
+            "score_delta": self.score_delta,
+        }
+
+
+@dataclass
+class ScanDelta:
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    modified: List[AppChange] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.modified)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "added": self.added,
+            "removed": self.removed,
+            "modified": [change.to_dict() for change in self.modified],
+        }
+
+
+def _as_plain(value: Any) -> Any:
+    # Store rows hand out shared tuples; report lists like the old dicts did.
+    return list(value) if isinstance(value, tuple) else value
+
+
+def _same_row(old: AppStore, old_row: int, new: AppStore, new_row: int) -> bool:
+    # Cheapest and most likely to differ first. Reason codes follow from
+    # every scoring input, suspicious keywords included.
+    if (
+        old.risk_score[old_row] != new.risk_score[new_row]
+        or old.risk_codes[old_row] != new.risk_codes[new_row]
+        or old.app_name[old_row] != new.app_name[new_row]
+        or old.permissions[old_row] != new.permissions[new_row]
+    ):
+        return False
+    for name, column in new.flags.items():
+        if old.flags[name][old_row] != column[new_row]:
+            return False
+    for name, column in new.usage.items():
+        if old.usage[name][old_row] != column[new_row]:
+            return False
+    # Extras are string codes into each store's own table: compare values
+    return all(old.value(old_row, name) == new.value(new_row, name) for name in EXTRA_FIELDS)
+
+
+def diff_stores(old: AppStore, new: AppStore) -> ScanDelta:
+    """
+    Added, removed and modified apps between two snapshots. Modified apps
+    carry per-field (old, new) values and the risk score delta.
+    """
+    delta = ScanDelta()
+    for new_row, package_name in enumerate(new.package_name):
+        old_row = old.row_of(package_name)
+        if old_row < 0:
+            delta.added.append(package_name)
+            continue
+        if _same_row(old, old_row, new, new_row):
+            continue
+
+        changes: Dict[str, Tuple[Any, Any]] = {}
+        for name in _DIFF_FIELDS:
+            before = old.value(old_row, name)
+            after = new.value(new_row, name)
+            if before != after:
+                changes[name] = (_as_plain(before), _as_plain(after))
+        delta.modified.append(
+            AppChange(
+                package_name=package_name,
+                changes=changes,
+                old_score=old.risk_score[old_row],
+                new_score=new.risk_score[new_row],
+            )
+        )
+
+    delta.removed = [pkg for pkg in old.package_name if pkg not in new]
+    return delta
+
+
+class ChangeFeed:
+    """
+    Bounded, sequence-numbered history of scan deltas.
+
+    publish() returns the sequence number of the new delta. since(seq)
+    returns every delta published after seq, or None if some of them were
+    already evicted, in which case the consumer must reload the snapshot.
+    Safe to read from request threads while the refresh thread publishes.
+    """
+
+    def __init__(self, max_deltas: int = 64) -> None:
+        self._deltas: Deque[Tuple[int, ScanDelta]] = deque(maxlen=max_deltas)
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    @property
+    def seq(self) -> int:
+        return self._seq
+
+    def publish(self, delta: ScanDelta) -> int:
+        with self._lock:
+            self._seq += 1
+            self._deltas.append((self._seq, delta))
+            return self._seq
+
+    def since(self, seq: int) -> Tuple[int, Optional[List[ScanDelta]]]:
+        """(latest seq, the deltas after seq or None if some were evicted)."""
+        with self._lock:
+            latest = self._seq
+            if seq >= latest:
+                return latest, []
+            oldest = self._deltas[0][0] if self._deltas else latest + 1
+            if seq + 1 < oldest:
+                return latest, None
+            return latest, [delta for s, delta in self._deltas if s > seq]
@@ -0,0 +1,149 @@
+# fake_winreg.py
+#
+# In-memory stand-in for the parts of the winreg module the scanner uses
+# (OpenKey, QueryInfoKey, EnumKey, QueryValueEx), so registry scanning can
+# be exercised and benchmarked on any OS:
+#
+#     reg = FakeRegistry(latency=0.0002)
+#     reg.add_apps(HKEY_LOCAL_MACHINE, path, [("App1", {"DisplayName": "App 1"})])
+#     get_installed_apps_windows(reg=reg)
+#
+# `latency` sleeps inside every call, standing in for the real registry
+# round-trip (during which winreg releases the GIL, as sleep does).
+
+import itertools
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+HKEY_CURRENT_USER = 0x80000001
+HKEY_LOCAL_MACHINE = 0x80000002
+REG_SZ = 1
+
+
+class _Node:
+    __slots__ = ("subkeys", "values", "last_write", "_names")
+
+    def __init__(self, last_write: int) -> None:
+        self.subkeys: Dict[str, "_Node"] = {}
+        self.values: Dict[str, Any] = {}
+        self.last_write = last_write
+        self._names: Optional[Tuple[str, ...]] = None
+
+    def subkey_names(self) -> Tuple[str, ...]:
+        # Cached so EnumKey by index stays O(1); reset when subkeys change
+        if self._names is None:
+            self._names = tuple(self.subkeys)
+        return self._names
+
+
+class FakeKey:
+    """Open key handle; usable as a context manager like winreg.HKEYType."""
+
+    def __init__(self, node: _Node) -> None:
+        self.node = node
+
+    def __enter__(self) -> "FakeKey":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.Close()
+
+    def Close(self) -> None:
+        pass
+
+
+class FakeRegistry:
+    HKEY_CURRENT_USER = HKEY_CURRENT_USER
+    HKEY_LOCAL_MACHINE = HKEY_LOCAL_MACHINE
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self._clock = itertools.count(1)
+        self._roots: Dict[int, _Node] = {}
+        self._lock = threading.Lock()
+        self.calls: Dict[str, int] = {}
+
+    # ---------- building the fake tree ----------
+
+    def _tick(self) -> int:
+        # Monotonic stand-in for FILETIME last-write timestamps
+        return next(self._clock)
+
+    def _node(self, root: int, path: str, create: bool) -> Optional[_Node]:
+        node = self._roots.get(root)
+        if node is None:
+            if not create:
+                return None
+            node = self._roots[root] = _Node(self._tick())
+        for part in filter(None, path.split("\\")):
+            child = node.subkeys.get(part)
+            if child is None:
+                if not create:
+                    return None
+                child = node.subkeys[part] = _Node(self._tick())
+                node._names = None
+                node.last_write = self._tick()
+            node = child
+        return node
+
+    def set_values(self, root: int, path: str, **values: Any) -> None:
+        """Create root\\path if needed and set its values (bumps last-write)."""
+        node = self._node(root, path, create=True)
+        node.values.update(values)
+        node.last_write = self._tick()
+
+    def delete_key(self, root: int, path: str) -> None:
+        parent_path, _, name = path.rpartition("\\")
+        parent = self._node(root, parent_path, create=False)
+        if parent is not None and parent.subkeys.pop(name, None) is not None:
+            parent._names = None
+            parent.last_write = self._tick()
+
+    def add_apps(self, root: int, path: str, apps: Iterable[Tuple[str, Dict[str, Any]]]) -> None:
+        """Add (subkey_name, values) uninstall entries under root\\path."""
+        for name, values in apps:
+            self.set_values(root, path + "\\" + name, **values)
+
+    def reset_calls(self) -> None:
+        self.calls = {}
+
+    # ---------- winreg API ----------
+
+    def _call(self, name: str) -> None:
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def OpenKey(self, key: Any, sub_key: str, reserved: int = 0, access: int = 0) -> FakeKey:
+        self._call("OpenKey")
+        if isinstance(key, FakeKey):
+            node = key.node
+            for part in filter(None, sub_key.split("\\")):
+                node = node.subkeys.get(part)
+                if node is None:
+                    break
+        else:
+            node = self._node(key, sub_key, create=False)
+        if node is None:
+            raise FileNotFoundError(2, "The system cannot find the file specified")
+        return FakeKey(node)
+
+    def QueryInfoKey(self, key: FakeKey) -> Tuple[int, int, int]:
+        self._call("QueryInfoKey")
+        node = key.node
+        return len(node.subkeys), len(node.values), node.last_write
+
+    def EnumKey(self, key: FakeKey, index: int) -> str:
+        self._call("EnumKey")
+        names = key.node.subkey_names()
+        if index >= len(names):
+            raise OSError(259, "No more data is available")
+        return names[index]
+
+    def QueryValueEx(self, key: FakeKey, value_name: str) -> Tuple[Any, int]:
+        self._call("QueryValueEx")
+        if value_name not in key.node.values:
+            raise FileNotFoundError(2, "The system cannot find the file specified")
+        return key.node.values[value_name], REG_SZ
@@ -0,0 +1,218 @@
+# fleet.py
+#
+# Fleet scoring mode: score a directory of per-device inventory files
+# (JSON array / JSONL, optionally gzipped; one file per device) across a
+# process pool, and produce per-device summaries plus a fleet rollup.
+#
+# Usage: python fleet.py INVENTORY_DIR [--workers N] [--chunk-size N] [--top N]
+#                        [--threshold SCORE] [--json OUT]
+
+import argparse
+import json
+import os
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from appstore import RISK_LEVELS
+from storage import iter_inventory_records, iter_scored_chunks
+from topk import TopK
+
+INVENTORY_SUFFIXES = (".json", ".jsonl", ".json.gz", ".jsonl.gz")
+DEFAULT_TOP_N = 10
+# Devices per work item: big enough to amortize inter-process overhead,
+# small enough to keep all workers busy until the end.
+DEFAULT_CHUNK_SIZE = 32
+
+# (risk_score, package_name, app_name, risk_level)
+RiskyApp = Tuple[float, str, str, str]
+
+
+@dataclass
+class DeviceSummary:
+    device: str
+    apps: int = 0
+    level_counts: Dict[str, int] = field(default_factory=lambda: dict.fromkeys(RISK_LEVELS, 0))
+    top_apps: List[RiskyApp] = field(default_factory=list)
+    # Apps scoring at least the alert threshold (when one is set)
+    above_threshold: int = 0
+    error: Optional[str] = None
+
+
+@dataclass
+class FleetReport:
+    devices: List[DeviceSummary]
+    total_apps: int
+    level_counts: Dict[str, int]
+    devices_with_high_risk: int
+    failed_devices: int
+    threshold: Optional[float]
+    apps_above_threshold: int
+    devices_above_threshold: int
+    # (risk_score, device, package_name, app_name, risk_level)
+    top_apps: List[Tuple[float, str, str, str, str]]
+    elapsed_seconds: float
+
+    def to_dict(self) -> Dict[str, object]:
+        return asdict(self)
+
+
+def device_name(path: str) -> str:
+    name = os.path.basename(path)
+    for suffix in sorted(INVENTORY_SUFFIXES, key=len, reverse=True):
+        if name.endswith(suffix):
+            return name[: -len(suffix)]
+    return name
+
+
+def iter_device_files(directory: str) -> List[str]:
+    """Inventory files directly inside directory, sorted by name."""
+    return sorted(
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if name.endswith(INVENTORY_SUFFIXES)
+    )
+
+
+def score_device(
+    path: str, top_n: int = DEFAULT_TOP_N, threshold: Optional[float] = None
+) -> DeviceSummary:
+    """
+    Stream one device inventory and summarize it. Only a running top_n
+    heap of the riskiest apps is kept, never the full inventory; apps
+    scoring at least `threshold` are counted as they stream past.
+    """
+    summary = DeviceSummary(device=device_name(path))
+    top: TopK[RiskyApp] = TopK(top_n)
+    try:
+        for chunk in iter_scored_chunks(iter_inventory_records(path)):
+            for app, score, level, _, _ in chunk:
+                summary.apps += 1
+                summary.level_counts[level] += 1
+                if threshold is not None and score >= threshold:
+                    summary.above_threshold += 1
+                top.push((score, app.package_name, app.app_name, level))
+    except (
+        OSError,  # including gzip.BadGzipFile
+        EOFError,  # truncated gzip stream
+        zlib.error,  # corrupt gzip stream
+        ValueError,
+        TypeError,
+        AttributeError,
+        KeyError,
+    ) as exc:
+        # A malformed file fails its own device, not the fleet run
+        summary.error = f"{type(exc).__name__}: {exc}"
+    summary.top_apps = top.items()
+    return summary
+
+
+def _score_device_chunk(
+    paths: Sequence[str], top_n: int, threshold: Optional[float]
+) -> List[DeviceSummary]:
+    # Worker entry point: one task scores a whole chunk of devices.
+    return [score_device(path, top_n, threshold) for path in paths]
+
+
+def _rollup(
+    devices: List[DeviceSummary], top_n: int, threshold: Optional[float], elapsed: float
+) -> FleetReport:
+    level_counts = dict.fromkeys(RISK_LEVELS, 0)
+    # Failed devices are reported, but their partial counts are not totalled
+    scored = [d for d in devices if not d.error]
+    # Every device's top_n contains its share of the fleet-wide top_n
+    top: TopK[Tuple[float, str, str, str, str]] = TopK(top_n)
+    for summary in scored:
+        for level, count in summary.level_counts.items():
+            level_counts[level] += count
+        for score, package_name, app_name, level in summary.top_apps:
+            top.push((score, summary.device, package_name, app_name, level))
+
+    return FleetReport(
+        devices=devices,
+        total_apps=sum(d.apps for d in scored),
+        level_counts=level_counts,
+        devices_with_high_risk=sum(1 for d in scored if d.level_counts["High"]),
+        failed_devices=len(devices) - len(scored),
+        threshold=threshold,
+        apps_above_threshold=sum(d.above_threshold for d in scored),
+        devices_above_threshold=sum(1 for d in scored if d.above_threshold),
+        top_apps=top.items(),
+        elapsed_seconds=elapsed,
+    )
+
+
+def score_fleet(
+    directory: str,
+    workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    top_n: int = DEFAULT_TOP_N,
+    threshold: Optional[float] = None,
+) -> FleetReport:
+    """
+    Score every device inventory in directory on `workers` processes
+    (default: all cores; 1 scores in-process). Devices are handed out in
+    chunks of chunk_size and summaries come back in file-name order.
+    With a threshold, apps scoring at least that much are counted per
+    device and fleet-wide.
+    """
+    start = time.perf_counter()
+    paths = iter_device_files(directory)
+    chunks = [paths[i : i + chunk_size] for i in range(0, len(paths), chunk_size)]
+    workers = workers or os.cpu_count() or 1
+
+    devices: List[DeviceSummary] = []
+    if workers <= 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            devices.extend(_score_device_chunk(chunk, top_n, threshold))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for result in pool.map(
+                _score_device_chunk,
+                chunks,
+                [top_n] * len(chunks),
+                [threshold] * len(chunks),
+            ):
+                devices.extend(result)
+
+    return _rollup(devices, top_n, threshold, time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Score a directory of device inventories")
+    parser.add_argument("directory")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP_N)
+    parser.add_argument(
+        "--threshold", type=float, default=None, help="count apps scoring at least this"
+    )
+    parser.add_argument("--json", help="write the full report (with per-device summaries) here")
+    args = parser.parse_args()
+
+    report = score_fleet(
+        args.directory, args.workers, args.chunk_size, args.top, args.threshold
+    )
+    print(
+        f"[SpyShield] Scored {len(report.devices)} devices / {report.total_apps} apps "
+        f"in {report.elapsed_seconds:.2f}s ({report.failed_devices} failed)."
+    )
+    print(f"[SpyShield] Apps per level: {report.level_counts}")
+    print(f"[SpyShield] Devices with High-risk apps: {report.devices_with_high_risk}")
+    if report.threshold is not None:
+        print(
+            f"[SpyShield] Apps scoring >= {report.threshold:g}: "
+            f"{report.apps_above_threshold} on {report.devices_above_threshold} devices"
+        )
+    for score, device, package_name, app_name, level in report.top_apps:
+        print(f"  {score:6.1f} {level:<6} {device}: {app_name} ({package_name})")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report.to_dict(), f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# gunicorn.conf.py
+#
+# Multi-worker deployment: `gunicorn -w 4 app:app` picks this file up,
+# starts one publisher process (publisher.py) next to the master, and
+# every worker follows the snapshot file it writes instead of scanning
+# on its own. Static assets are fingerprinted and compressed once, before
+# the workers load the app (see assets.py).
+
+import os
+import subprocess
+import sys
+import time
+
+from assets import build_assets
+from snapshot import scan_error_path
+
+snapshot_path = os.environ.setdefault("SPYSHIELD_SNAPSHOT", "spyshield.snap")
+os.environ.setdefault("SPYSHIELD_ROLE", "follower")
+
+# Seconds to wait for the first snapshot before starting workers anyway
+PUBLISH_TIMEOUT = float(os.environ.get("SPYSHIELD_PUBLISH_TIMEOUT", "300"))
+
+_publisher = None
+
+
+def on_starting(server):
+    global _publisher
+    static_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+    if os.path.isdir(static_folder):
+        try:
+            build_assets(static_folder)
+        except OSError as exc:
+            print("[SpyShield] Could not build static assets; serving them unversioned.")
+            print("Error:", exc)
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "publisher.py")
+    _publisher = subprocess.Popen([sys.executable, script, "--snapshot", snapshot_path])
+    deadline = time.monotonic() + PUBLISH_TIMEOUT
+    # Until the first snapshot is published, its scan fails (workers then
+    # show the error) or the publisher exits
+    while (
+        not os.path.exists(snapshot_path)
+        and not os.path.exists(scan_error_path(snapshot_path))
+        and _publisher.poll() is None
+        and time.monotonic() < deadline
+    ):
+        time.sleep(0.1)
+
+
+def on_exit(server):
+    if _publisher is not None and _publisher.poll() is None:
+        _publisher.terminate()
+        _publisher.wait(timeout=10)
@@ -0,0 +1,88 @@
+# matcher.py
+#
+# Aho-Corasick multi-pattern matcher for the scanner heuristics.
+# The automaton is built once from a keyword list; matching a string then
+# costs one pass over its characters, however many keywords there are,
+# and reports every keyword that occurs in it (overlaps included).
+
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+
+class KeywordMatcher:
+    """
+    Case-insensitive substring matcher for a fixed set of keywords.
+
+        m = KeywordMatcher(["remote", "viewer", "teamviewer"])
+        m.find_all("TeamViewer Host")  # ["teamviewer", "viewer"]
+
+    Keywords are reported in their lower-cased form, each at most once,
+    ordered by where their first occurrence ends in the text.
+    """
+
+    def __init__(self, keywords: Iterable[str]) -> None:
+        # Distinct non-empty keywords, lower-cased, in the given order
+        self.keywords: Tuple[str, ...] = tuple(
+            dict.fromkeys(k.lower() for k in keywords if k)
+        )
+        # State 0 is the root. goto[s] maps a character to the next state,
+        # fail[s] is the longest proper suffix state, and out[s] lists the
+        # keywords ending at s (including those inherited via fail links).
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[str, ...]] = [()]
+
+        for keyword in self.keywords:
+            state = 0
+            for ch in keyword:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = nxt
+            self._out[state] += (keyword,)
+
+        # Breadth-first, so every fail target is complete before it is used
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] += self._out[self._fail[nxt]]
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def find_all(self, text: str) -> List[str]:
+        """Every keyword occurring in text, in a single pass."""
+        goto, fail, out = self._goto, self._fail, self._out
+        found: Dict[str, None] = {}
+        state = 0
+        for ch in text.lower():
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                for keyword in out[state]:
+                    found[keyword] = None
+        return list(found)
+
+    def search(self, text: str) -> bool:
+        """True if any keyword occurs in text (stops at the first match)."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for ch in text.lower():
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                return True
+        return False
@@ -0,0 +1,346 @@
+# metrics.py
+#
+# Lightweight in-process instrumentation: counters, gauges and histograms
+# (with label values), rendered in the Prometheus text format for
+# /metrics and summarized for the Streamlit diagnostics panel.
+#
+# Pipeline stages are timed with `with stage("score"): ...`. Set
+# SPYSHIELD_METRICS=0 to disable recording: stage() then returns a shared
+# no-op context manager and observe()/inc()/set() return immediately.
+
+import abc
+import bisect
+import math
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+# Seconds; covers sub-millisecond renders up to multi-minute scans
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+)
+
+
+class Sample(NamedTuple):
+    """One gauge or counter value produced by a collector at scrape time."""
+
+    name: str
+    kind: str  # "gauge" or "counter"
+    help: str
+    labels: Dict[str, str]
+    value: float
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(abc.ABC):
+    kind = ""
+
+    def __init__(self, registry: "MetricsRegistry", name: str, help: str, labels: Sequence[str]):
+        self._registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._render_samples())
+        return lines
+
+    @abc.abstractmethod
+    def _render_samples(self) -> List[str]:
+        """Sample lines, without the HELP and TYPE header."""
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args: Any) -> None:
+        super().__init__(*args)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, *labels: str) -> None:
+        if not self._registry.enabled:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in values
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        if not self._registry.enabled:
+            return
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args: Any, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        super().__init__(*args)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum]
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        if not self._registry.enabled:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def time(self, *labels: str) -> "_Timer":
+        """Context manager observing the duration of its block."""
+        if not self._registry.enabled:
+            return _NULL_TIMER
+        return _Timer(self, labels)
+
+    def _copy_series(self) -> List[Tuple[Tuple[str, ...], List[int], float]]:
+        # Under the lock, so observe() can neither add a label set nor
+        # update counts and sum while they are read.
+        with self._lock:
+            return [
+                (labels, counts[:], total) for labels, (counts, total) in self._series.items()
+            ]
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """count, sum, mean and bucket-estimated p50/p95 per label set."""
+        rows = []
+        for labels, counts, total in sorted(self._copy_series()):
+            count = sum(counts)
+            rows.append(
+                {
+                    **dict(zip(self.labelnames, labels)),
+                    "count": count,
+                    "total_s": total,
+                    "mean_s": total / count if count else 0.0,
+                    "p50_s": self._quantile(counts, 0.5),
+                    "p95_s": self._quantile(counts, 0.95),
+                }
+            )
+        return rows
+
+    def _quantile(self, counts: List[int], q: float) -> float:
+        # Upper bound of the bucket holding the q-th observation
+        target = q * sum(counts)
+        seen = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            seen += count
+            if seen >= target and count:
+                return bound
+        return 0.0
+
+    def _render_samples(self) -> List[str]:
+        lines = []
+        for labels, counts, total in sorted(self._copy_series()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+                )
+            suffix = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{suffix} {_format_value(total)}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_labels", "_start")
+
+    def __init__(self, histogram: Histogram, labels: Tuple[str, ...]) -> None:
+        self._histogram = histogram
+        self._labels = labels
+
+    def __enter__(self) -> "_Timer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._histogram.observe(time.perf_counter() - self._start, *self._labels)
+
+
+class _NullTimer:
+    def __enter__(self) -> "_NullTimer":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class MetricsRegistry:
+    """
+    Named metrics plus collectors: callables producing Samples at scrape
+    time, for values that already live elsewhere (snapshot size, cache
+    statistics) and would cost something to keep updating.
+    """
+
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+        self._lock = threading.Lock()
+
+    def _get(self, cls: type, name: str, help: str, labels: Sequence[str], **kwargs: Any) -> Any:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(self, name, help, labels, **kwargs)
+            return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        self._collectors.append(collector)
+
+    def collect(self) -> List[Sample]:
+        samples: List[Sample] = []
+        for collector in self._collectors:
+            samples.extend(collector())
+        return samples
+
+    def render(self) -> str:
+        """Everything in the Prometheus text exposition format (0.0.4)."""
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        described = set()
+        for sample in self.collect():
+            if sample.name not in described:
+                described.add(sample.name)
+                lines.append(f"# HELP {sample.name} {sample.help}")
+                lines.append(f"# TYPE {sample.name} {sample.kind}")
+            names = tuple(sample.labels)
+            labels = _format_labels(names, [sample.labels[n] for n in names])
+            lines.append(f"{sample.name}{labels} {_format_value(sample.value)}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry(enabled=os.environ.get("SPYSHIELD_METRICS", "1") != "0")
+
+STAGE_SECONDS = METRICS.histogram(
+    "spyshield_stage_seconds",
+    "Duration of one run of a pipeline stage (scan, registry, map, score, index)",
+    ("stage",),
+)
+RENDER_SECONDS = METRICS.histogram(
+    "spyshield_render_seconds", "Template rendering time per page view", ("view",)
+)
+SCANS = METRICS.counter("spyshield_scans_total", "Completed scans", ("result",))
+
+
+def stage(name: str):
+    """Time a block as one run of pipeline stage `name`."""
+    return STAGE_SECONDS.time(name)
+
+
+def snapshot_samples(snapshot: Any) -> List[Sample]:
+    """Gauges describing the snapshot being served (for collectors)."""
+    samples = [
+        Sample(
+            "spyshield_snapshot_generation",
+            "gauge",
+            "Generation of the snapshot being served",
+            {},
+            snapshot.generation,
+        ),
+        Sample("spyshield_snapshot_apps", "gauge", "Apps in the served snapshot", {}, 0),
+        Sample(
+            "spyshield_snapshot_scan_seconds",
+            "gauge",
+            "Duration of the scan that built the served snapshot",
+            {},
+            snapshot.scan_seconds,
+        ),
+        Sample(
+            "spyshield_snapshot_built_timestamp_seconds",
+            "gauge",
+            "Unix time the served snapshot was built",
+            {},
+            snapshot.built_at,
+        ),
+    ]
+    total = 0
+    for level, count in snapshot.level_counts.items():
+        total += count
+        samples.append(
+            Sample(
+                "spyshield_snapshot_apps_by_level",
+                "gauge",
+                "Apps in the served snapshot per risk level",
+                {"level": level},
+                count,
+            )
+        )
+    samples[1] = samples[1]._replace(value=total)
+    return samples
+
+
+def diagnostics(extra: Optional[Iterable[Sample]] = None) -> Dict[str, Any]:
+    """Stage timings and collector values as plain data (Streamlit panel)."""
+    return {
+        "enabled": METRICS.enabled,
+        # Renders are listed as stages named "render/<view>"
+        "stages": STAGE_SECONDS.summary()
+        + [
+            {"stage": "render/" + row.pop("view"), **row}
+            for row in RENDER_SECONDS.summary()
+        ],
+        "values": [
+            {"metric": s.name, **s.labels, "value": s.value}
+            for s in list(METRICS.collect()) + list(extra or ())
+        ],
+    }
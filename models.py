@@ -1,8 +1,13 @@
 # models.py
 
+import functools
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass, field
 from typing import List, Dict, Any, Tuple
 
+from permissions import PERMISSIONS
+
 
 @dataclass
 class AppInfo:
@@ -17,6 +22,28 @@ class AppInfo:
     has_overlay_permission: bool = False
     foreground_service_usage_score: float = 0.0  # 0.0 - 1.0
     background_network_usage_score: float = 0.0  # 0.0 - 1.0
+    # Suspicious name keywords found by the scanner heuristics (matcher.py)
+    suspicious_keywords: List[str] = field(default_factory=list)
+    # Bitset of interned permission ids (see permissions.py), derived from
+    # `permissions` at construction time.
+    permission_mask: int = field(default=0, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # Share one string object per permission across all apps. The list
+        # is kept as given: a permission listed twice is scored twice.
+        self.permissions = [PERMISSIONS.canonical(p) for p in self.permissions]
+        self.permission_mask = PERMISSIONS.mask(self.permissions)
+
+    def has_permissions(self, *perms: str) -> bool:
+        """True if the app holds every permission in perms."""
+        # id_of, not mask: queries must not grow the shared interner
+        wanted = 0
+        for perm in perms:
+            pid = PERMISSIONS.id_of(perm)
+            if pid < 0:
+                return False
+            wanted |= 1 << pid
+        return self.permission_mask & wanted == wanted
 
     @staticmethod
     def from_dict(data: Dict[str, Any]) -> "AppInfo":
@@ -36,10 +63,11 @@ class AppInfo:
             background_network_usage_score=float(
                 data.get("background_network_usage_score", 0.0)
             ),
+            suspicious_keywords=data.get("suspicious_keywords") or [],
         )
 
     def to_dict(self) -> Dict[str, Any]:
-        return {
+        info = {
             "package_name": self.package_name,
             "app_name": self.app_name,
             "permissions": self.permissions,
@@ -52,84 +80,150 @@ class AppInfo:
             "foreground_service_usage_score": self.foreground_service_usage_score,
             "background_network_usage_score": self.background_network_usage_score,
         }
+        if self.suspicious_keywords:
+            info["suspicious_keywords"] = self.suspicious_keywords
+        return info
 
 
-def compute_risk(app: AppInfo) -> Tuple[float, str, List[str]]:
+# Weights for sensitive Android permissions (simplified example set).
+# Module-level so the table is built once instead of on every call.
+PERMISSION_WEIGHTS: Dict[str, int] = {
+    "android.permission.READ_SMS": 10,
+    "android.permission.RECEIVE_SMS": 8,
+    "android.permission.READ_CALL_LOG": 8,
+    "android.permission.CALL_PHONE": 4,
+    "android.permission.RECORD_AUDIO": 8,
+    "android.permission.CAMERA": 5,
+    "android.permission.READ_CONTACTS": 5,
+    "android.permission.ACCESS_FINE_LOCATION": 3,
+    "android.permission.ACCESS_COARSE_LOCATION": 2,
+    "android.permission.SYSTEM_ALERT_WINDOW": 10,
+    "android.permission.READ_PHONE_STATE": 5,
+}
+
+# Interned ids of the weighted permissions: apps whose mask misses all of
+# them skip the per-permission scoring loop.
+WEIGHTED_PERMISSION_MASK = PERMISSIONS.mask(PERMISSION_WEIGHTS)
+
+
+# Reason codes: compact "<rule>:<weight>" or "<rule>:<weight>:<argument>"
+# strings recorded by risk_codes() instead of the explanation text, which
+# render_reasons() produces on demand from these templates.
+REASON_TEMPLATES: Dict[str, str] = {
+    "media_projection": "Uses MediaProjection / screen capture capability.",
+    "accessibility": "Runs an Accessibility Service (can read screen content).",
+    "overlay": "Has overlay (draw over other apps) permission.",
+    "permission": "Uses sensitive permission: {arg} (+{weight}).",
+    "foreground_high": (
+        "Runs long-lived foreground services frequently (possible background spying)."
+    ),
+    "foreground_moderate": "Moderate use of foreground services (needs review).",
+    "background_high": (
+        "High background network usage (sending data while not in active use)."
+    ),
+    "background_moderate": "Moderate background network usage (monitor if unexpected).",
+    "system_app": "System app: slightly reduced risk (still monitor for abuse).",
+    "store": "Installed from official store: slightly reduced risk.",
+    "no_launcher": "No launcher icon: app may be trying to hide from the user.",
+    "keywords": "Name matches suspicious keywords: {arg}.",
+}
+
+# Codes without an argument are constants, built once here
+_PERMISSION_CODES: Dict[str, str] = {
+    perm: f"permission:{w}:{perm}" for perm, w in PERMISSION_WEIGHTS.items()
+}
+
+
+def reason_code(rule: str, weight: int, arg: str = "") -> str:
+    code = f"{rule}:{weight}"
+    return f"{code}:{arg}" if arg else code
+
+
+def parse_reason_code(code: str) -> Tuple[str, int, str]:
+    """(rule, weight, argument) of a reason code."""
+    rule, weight, *arg = code.split(":", 2)
+    return rule, int(weight), arg[0] if arg else ""
+
+
+def render_reason(code: str) -> str:
+    """The explanation text of one reason code."""
+    rule, weight, arg = parse_reason_code(code)
+    return REASON_TEMPLATES[rule].format(weight=weight, arg=arg)
+
+
+@functools.lru_cache(maxsize=4096)
+def render_reasons(codes: Tuple[str, ...]) -> Tuple[str, ...]:
     """
-    Compute a 0-100 risk score for the app, along with a risk level
-    (Low/Medium/High) and a list of textual reasons.
+    Explanation texts of a tuple of reason codes. Memoized: apps with the
+    same features share one codes tuple, and so one rendered tuple.
+    """
+    return tuple(render_reason(code) for code in codes)
 
-    This is rule-based and explainable.
+
+def risk_codes(app: AppInfo) -> Tuple[float, str, List[str]]:
+    """
+    Score-only version of compute_risk: the same 0-100 score and level,
+    with reason codes instead of formatted explanations. Bulk scoring uses
+    this; render_reasons() turns the codes into compute_risk's reasons.
     """
 
     score = 0.0
-    reasons: List[str] = []
+    codes: List[str] = []
 
     # 1. Core dangerous behaviors
     if app.uses_media_projection:
         score += 30
-        reasons.append("Uses MediaProjection / screen capture capability.")
+        codes.append("media_projection:30")
 
     if app.uses_accessibility_service:
         score += 25
-        reasons.append("Runs an Accessibility Service (can read screen content).")
+        codes.append("accessibility:25")
 
     if app.has_overlay_permission:
         score += 15
-        reasons.append("Has overlay (draw over other apps) permission.")
+        codes.append("overlay:15")
 
     # 2. Permissions-based signals (simplified example set)
-    permission_weights = {
-        "android.permission.READ_SMS": 10,
-        "android.permission.RECEIVE_SMS": 8,
-        "android.permission.READ_CALL_LOG": 8,
-        "android.permission.CALL_PHONE": 4,
-        "android.permission.RECORD_AUDIO": 8,
-        "android.permission.CAMERA": 5,
-        "android.permission.READ_CONTACTS": 5,
-        "android.permission.ACCESS_FINE_LOCATION": 3,
-        "android.permission.ACCESS_COARSE_LOCATION": 2,
-        "android.permission.SYSTEM_ALERT_WINDOW": 10,
-        "android.permission.READ_PHONE_STATE": 5,
-    }
-
-    for perm in app.permissions:
-        if perm in permission_weights:
-            w = permission_weights[perm]
-            score += w
-            reasons.append(f"Uses sensitive permission: {perm} (+{w}).")
+    # The mask skips the scan for apps without weighted permissions; the
+    # others are scored per listed permission, duplicates included.
+    if app.permission_mask & WEIGHTED_PERMISSION_MASK:
+        for perm in app.permissions:
+            if perm in PERMISSION_WEIGHTS:
+                score += PERMISSION_WEIGHTS[perm]
+                codes.append(_PERMISSION_CODES[perm])
 
     # 3. Behavioral scores
     if app.foreground_service_usage_score > 0.7:
         score += 10
-        reasons.append(
-            "Runs long-lived foreground services frequently (possible background spying)."
-        )
+        codes.append("foreground_high:10")
     elif app.foreground_service_usage_score > 0.4:
         score += 5
-        reasons.append(
-            "Moderate use of foreground services (needs review)."
-        )
+        codes.append("foreground_moderate:5")
 
     if app.background_network_usage_score > 0.7:
         score += 10
-        reasons.append("High background network usage (sending data while not in active use).")
+        codes.append("background_high:10")
     elif app.background_network_usage_score > 0.4:
         score += 5
-        reasons.append("Moderate background network usage (monitor if unexpected).")
+        codes.append("background_moderate:5")
 
     # 4. Trust modifiers
     if app.is_system_app:
         score -= 10
-        reasons.append("System app: slightly reduced risk (still monitor for abuse).")
+        codes.append("system_app:-10")
 
     if app.installed_from_play_store:
         score -= 5
-        reasons.append("Installed from official store: slightly reduced risk.")
+        codes.append("store:-5")
 
     if not app.has_launcher_icon:
         score += 10
-        reasons.append("No launcher icon: app may be trying to hide from the user.")
+        codes.append("no_launcher:10")
+
+    # 5. Name heuristics (explanation only; the scanner already turned
+    # them into the behavioral signals scored above)
+    if app.suspicious_keywords:
+        codes.append(reason_code("keywords", 0, ", ".join(app.suspicious_keywords)))
 
     # Clamp score between 0 and 100
     score = max(0.0, min(100.0, score))
@@ -142,4 +236,96 @@ def compute_risk(app: AppInfo) -> Tuple[float, str, List[str]]:
     else:
         level = "Low"
 
-    return score, level, reasons
+    return score, level, codes
+
+
+def compute_risk(app: AppInfo) -> Tuple[float, str, List[str]]:
+    """
+    Compute a 0-100 risk score for the app, along with a risk level
+    (Low/Medium/High) and a list of textual reasons.
+
+    This is rule-based and explainable.
+    """
+    score, level, codes = risk_codes(app)
+    return score, level, list(render_reasons(tuple(codes)))
+
+
+def _usage_band(value: float) -> int:
+    # compute_risk only distinguishes > 0.7, > 0.4 and the rest
+    return 2 if value > 0.7 else 1 if value > 0.4 else 0
+
+
+def risk_feature_key(app: AppInfo) -> Tuple[Any, ...]:
+    """
+    Canonical key of everything that affects compute_risk's output: the
+    weighted permissions (in order, since reasons follow that order), the
+    flags, and the usage-score bands. Apps with equal keys get identical
+    (score, level, reasons), whatever their names or exact usage scores.
+    """
+    weighted: Tuple[str, ...] = ()
+    if app.permission_mask & WEIGHTED_PERMISSION_MASK:
+        weighted = tuple(p for p in app.permissions if p in PERMISSION_WEIGHTS)
+    return (
+        weighted,
+        bool(app.uses_media_projection),
+        bool(app.uses_accessibility_service),
+        bool(app.has_overlay_permission),
+        _usage_band(app.foreground_service_usage_score),
+        _usage_band(app.background_network_usage_score),
+        bool(app.is_system_app),
+        bool(app.installed_from_play_store),
+        bool(app.has_launcher_icon),
+        tuple(app.suspicious_keywords),
+    )
+
+
+class RiskMemo:
+    """
+    Bounded LRU memo of risk_codes, keyed by risk_feature_key.
+
+    Returns (score, level, codes) with the reason codes as a tuple that is
+    shared by every app with the same features, so a fleet of devices
+    holding the same apps stores each distinct explanation once. Pass the
+    codes to render_reasons() for the text.
+    """
+
+    def __init__(self, max_entries: int = 65536) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[Any, ...], Tuple[float, str, Tuple[str, ...]]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def score(self, app: AppInfo) -> Tuple[float, str, Tuple[str, ...]]:
+        key = risk_feature_key(app)
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+
+        score, level, codes = risk_codes(app)
+        result = (score, level, tuple(codes))
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = result
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+
+# Process-wide memo used by the ingest pipeline (and so by fleet workers).
+RISK_MEMO = RiskMemo()
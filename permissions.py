@@ -0,0 +1,141 @@
+# permissions.py
+#
+# Compact permission representation:
+# - PermissionInterner maps each permission string to a small integer id,
+#   so a set of permissions is just an int bitmask (bit i = permission id i).
+# - PermissionIndex inverts that across many apps: one row bitset per
+#   permission, so "which apps hold A AND B" is a single big-int AND.
+
+from typing import Dict, Iterable, Iterator, List
+
+
+class PermissionInterner:
+    """
+    Global permission string <-> id table.
+
+    Ids are assigned in first-seen order and never change, so masks built
+    at different times stay comparable. Interned strings are shared, so
+    the same permission is stored once no matter how many apps hold it.
+    """
+
+    def __init__(self) -> None:
+        self._ids: Dict[str, int] = {}
+        self._names: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def intern(self, perm: str) -> int:
+        pid = self._ids.get(perm)
+        if pid is None:
+            pid = len(self._names)
+            perm = str(perm)
+            self._ids[perm] = pid
+            self._names.append(perm)
+        return pid
+
+    def canonical(self, perm: str) -> str:
+        """Return the shared string object for perm."""
+        return self._names[self.intern(perm)]
+
+    def id_of(self, perm: str) -> int:
+        """Id of an already interned permission, or -1 if unknown."""
+        return self._ids.get(perm, -1)
+
+    def name(self, pid: int) -> str:
+        return self._names[pid]
+
+    def mask(self, perms: Iterable[str]) -> int:
+        mask = 0
+        for perm in perms:
+            mask |= 1 << self.intern(perm)
+        return mask
+
+    def names(self, mask: int) -> List[str]:
+        """Permission strings present in mask, in id order."""
+        return [self._names[pid] for pid in iter_bits(mask)]
+
+
+def iter_bits(bits: int) -> Iterator[int]:
+    """
+    Yield the positions of the set bits of a (possibly huge) int, ascending.
+
+    Walks the binary string with str.find, so the cost is one C-level scan
+    plus one step per set bit, instead of one big-int operation per bit.
+    """
+    if bits <= 0:
+        return
+    digits = bin(bits)[:1:-1]  # little-endian, without the "0b" prefix
+    pos = digits.find("1")
+    while pos != -1:
+        yield pos
+        pos = digits.find("1", pos + 1)
+
+
+class PermissionIndex:
+    """
+    Inverted index over a list of permission masks (one per app row).
+
+    rows_with_all / rows_with_any return a row bitset (bit r = row r), so
+    combining filters costs O(apps / 64) machine words per operation.
+    Use iter_bits() to turn the result back into row numbers.
+    """
+
+    def __init__(self, masks: Iterable[int] = ()) -> None:
+        self._masks: List[int] = []
+        self._columns: Dict[int, int] = {}
+        self._dirty = False
+        for mask in masks:
+            self.add(mask)
+
+    def __len__(self) -> int:
+        return len(self._masks)
+
+    def add(self, mask: int) -> int:
+        """Append a row and return its row number."""
+        self._masks.append(mask)
+        self._dirty = True
+        return len(self._masks) - 1
+
+    def _build(self) -> None:
+        # Collect rows per permission first, then build each bitset in one
+        # go; OR-ing bits into a growing int row by row would be quadratic.
+        rows_by_perm: Dict[int, List[int]] = {}
+        for row, mask in enumerate(self._masks):
+            for pid in iter_bits(mask):
+                rows_by_perm.setdefault(pid, []).append(row)
+
+        nbytes = (len(self._masks) + 7) // 8
+        columns: Dict[int, int] = {}
+        for pid, rows in rows_by_perm.items():
+            buf = bytearray(nbytes)
+            for row in rows:
+                buf[row >> 3] |= 1 << (row & 7)
+            columns[pid] = int.from_bytes(buf, "little")
+        self._columns = columns
+        self._dirty = False
+
+    def column(self, perm: str) -> int:
+        """Row bitset of apps holding perm."""
+        if self._dirty:
+            self._build()
+        pid = PERMISSIONS.id_of(perm)
+        return self._columns.get(pid, 0)
+
+    def rows_with_all(self, *perms: str) -> int:
+        if not perms:
+            return (1 << len(self._masks)) - 1
+        result = self.column(perms[0])
+        for perm in perms[1:]:
+            result &= self.column(perm)
+        return result
+
+    def rows_with_any(self, *perms: str) -> int:
+        result = 0
+        for perm in perms:
+            result |= self.column(perm)
+        return result
+
+
+# Process-wide interner shared by AppInfo, scoring and indexes.
+PERMISSIONS = PermissionInterner()
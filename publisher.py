@@ -0,0 +1,113 @@
+# publisher.py
+#
+# Snapshot publisher for multi-process deployments (e.g. gunicorn with
+# several workers). This one process scans, scores and writes the
+# snapshot file; web workers started with SPYSHIELD_ROLE=follower only
+# map that file (snapshot.SnapshotFollower), so there is one scan per
+# rescan and one copy of the inventory, in the page cache, however many
+# workers there are.
+#
+# When a scan fails, its error is written next to the snapshot (see
+# scan_error_path) for followers to show, and until a first snapshot has
+# been published the scan is retried every FIRST_SCAN_RETRY seconds.
+#
+# Usage: python publisher.py [--snapshot PATH] [--interval SECONDS] [--poll SECONDS]
+
+import argparse
+import os
+import threading
+import time
+from typing import Optional
+
+from scan_jobs import DONE, FAILED
+from snapshot import SnapshotRefresher, rescan_request_path, scan_error_path
+
+DEFAULT_SNAPSHOT_PATH = "spyshield.snap"
+
+# Seconds between attempts while no scan has succeeded yet
+FIRST_SCAN_RETRY = 30.0
+
+
+def _report_scan_error(path: str, error: Optional[str]) -> None:
+    """Write (atomically) or remove the error file followers read."""
+    if error is None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        return
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(error)
+    os.replace(tmp_path, path)
+
+
+def run_publisher(
+    snapshot_path: str,
+    interval: Optional[float] = None,
+    poll: float = 1.0,
+    stop: Optional[threading.Event] = None,
+) -> None:
+    """
+    Publish snapshots to snapshot_path until `stop` is set: a saved file
+    is served as-is while the first scan runs, then a new generation is
+    written every `interval` seconds and whenever a follower asks for a
+    rescan (checked every `poll` seconds). A failed first scan does not
+    stop the publisher: followers are told, and it tries again.
+    """
+    stop = stop or threading.Event()
+    refresher = SnapshotRefresher(interval=interval, snapshot_path=snapshot_path)
+    refresher.load_file()
+    # Scans run on the refresher thread, so a failure is recorded on its
+    # job instead of propagating here
+    refresher.request_refresh("startup")
+    refresher.start()
+
+    request = rescan_request_path(snapshot_path)
+    error_path = scan_error_path(snapshot_path)
+    reported = None  # last job whose outcome was reported
+    retry_at = None
+    while not stop.wait(poll):
+        if os.path.exists(request):
+            try:
+                os.remove(request)
+            except FileNotFoundError:
+                pass
+            refresher.request_refresh()
+
+        job = refresher.jobs.latest()
+        if job is None or job.state not in (DONE, FAILED):
+            continue
+        if job is not reported:
+            reported = job
+            _report_scan_error(error_path, job.error if job.state == FAILED else None)
+            snapshot = refresher.current
+            first_failed = job.state == FAILED and (snapshot.partial or snapshot.generation == 0)
+            retry_at = time.monotonic() + FIRST_SCAN_RETRY if first_failed else None
+        elif retry_at is not None and time.monotonic() >= retry_at:
+            retry_at = None
+            refresher.request_refresh("retry")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Publish SpyShield snapshots for web workers")
+    parser.add_argument(
+        "--snapshot",
+        default=os.environ.get("SPYSHIELD_SNAPSHOT") or DEFAULT_SNAPSHOT_PATH,
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=float(os.environ.get("SPYSHIELD_RESCAN_INTERVAL", "0") or 0),
+    )
+    parser.add_argument("--poll", type=float, default=1.0)
+    args = parser.parse_args()
+    print(f"[SpyShield] Publishing snapshots to {args.snapshot}.")
+    try:
+        run_publisher(args.snapshot, args.interval, args.poll)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
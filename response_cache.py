@@ -0,0 +1,135 @@
+# response_cache.py
+#
+# Cache of rendered responses, keyed by (endpoint, view args, query args,
+# snapshot generation). Pages only change when a new snapshot is swapped
+# in, so a cached body stays valid for its whole generation. Responses
+# carry a strong ETag, and If-None-Match requests get a bodiless 304.
+# A view whose response also depends on something else (such as the state
+# of a running scan) marks it Cache-Control: no-store to skip the cache.
+
+import functools
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, Optional
+
+from flask import Response, current_app, make_response, request
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+DEFAULT_MAX_ENTRIES = 4096
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    mimetype: str
+    etag: str
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache of response bodies, bounded both by entry count
+    and by total body size. Bodies larger than a quarter of the byte budget
+    are never cached, so one huge page cannot flush everything else.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, entry: CachedResponse) -> None:
+        size = len(entry.body)
+        if size > self.max_bytes // 4:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old.body)
+            self._entries[key] = entry
+            self._bytes += size
+            while self._bytes > self.max_bytes or len(self._entries) > self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.body)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+def _etag_for(body: bytes) -> str:
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def _finish(entry: CachedResponse) -> Response:
+    if request.if_none_match.contains(entry.etag):
+        response = Response(status=304)
+    else:
+        response = Response(entry.body, mimetype=entry.mimetype)
+    response.set_etag(entry.etag)
+    # Let clients keep the body but revalidate it on every use.
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def cached_view(view: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Decorator for GET views that depend only on their arguments and the
+    current snapshot. Uses app.extensions["spyshield_cache"] if present,
+    otherwise calls the view directly.
+    """
+
+    @functools.wraps(view)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        cache: Optional[ResponseCache] = current_app.extensions.get("spyshield_cache")
+        if cache is None:
+            return view(*args, **kwargs)
+
+        generation = current_app.extensions["spyshield"].current.generation
+        key = (
+            request.endpoint,
+            tuple(sorted(kwargs.items())),
+            tuple(sorted(request.args.items(multi=True))),
+            generation,
+        )
+        entry = cache.get(key)
+        if entry is None:
+            response = make_response(view(*args, **kwargs))
+            if (
+                response.status_code != 200
+                or response.is_streamed
+                or response.cache_control.no_store
+            ):
+                return response
+            entry = CachedResponse(
+                body=response.get_data(),
+                mimetype=response.mimetype,
+                etag=_etag_for(response.get_data()),
+            )
+            cache.put(key, entry)
+        return _finish(entry)
+
+    return wrapper
@@ -0,0 +1,81 @@
+# scan_jobs.py
+#
+# Scan jobs: one record per requested scan with its state and progress,
+# so clients can poll GET /scans/<id> instead of waiting for the scan.
+# SnapshotRefresher (snapshot.py) creates and runs them on its worker.
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Finished jobs are forgotten once this many newer ones exist.
+MAX_JOBS = 100
+
+
+@dataclass
+class ScanJob:
+    id: str
+    reason: str  # "startup", "request" or "interval"
+    submitted_at: float = field(default_factory=time.time)
+    state: str = QUEUED
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    # Apps scored so far, and the total when the input size is known
+    # (registry and sample data; streamed inventory files are not counted
+    # up front).
+    scored: int = 0
+    total: Optional[int] = None
+    # Last generation this job published: partial ones while the first
+    # scan is running, then the complete one.
+    generation: Optional[int] = None
+    error: Optional[str] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.state in (DONE, FAILED)
+
+    @property
+    def progress(self) -> Optional[float]:
+        """Fraction done (0-1), or None while the total is unknown."""
+        if self.state == DONE:
+            return 1.0
+        if not self.total:
+            return None
+        return min(1.0, self.scored / self.total)
+
+    def to_dict(self) -> Dict[str, Any]:
+        info = asdict(self)
+        info["progress"] = self.progress
+        return info
+
+
+class ScanJobs:
+    """The most recent scan jobs by id (thread-safe)."""
+
+    def __init__(self, max_jobs: int = MAX_JOBS) -> None:
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, ScanJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, reason: str) -> ScanJob:
+        job = ScanJob(id=uuid.uuid4().hex[:16], reason=reason)
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+        return job
+
+    def get(self, job_id: str) -> Optional[ScanJob]:
+        return self._jobs.get(job_id)
+
+    def latest(self) -> Optional[ScanJob]:
+        with self._lock:
+            return next(reversed(self._jobs.values()), None)
@@ -2,17 +2,44 @@
 #
 # Enumerate installed applications on Windows using the Registry,
 # and map them into a dict format compatible with AppInfo.
+#
+# Every registry function takes an optional `reg` backend with the winreg
+# API (OpenKey, QueryInfoKey, EnumKey, QueryValueEx). It defaults to the
+# real winreg; fake_winreg.FakeRegistry lets the scanner run on any OS.
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Dict, Optional, Sequence, Tuple
+
+from matcher import KeywordMatcher
+from metrics import stage
 
-import winreg
-from typing import List, Dict, Tuple
+try:
+    import winreg
+except ImportError:  # not on Windows: only fake backends can be used
+    winreg = None
+
+HKEY_CURRENT_USER = getattr(winreg, "HKEY_CURRENT_USER", 0x80000001)
+HKEY_LOCAL_MACHINE = getattr(winreg, "HKEY_LOCAL_MACHINE", 0x80000002)
 
 # Registry locations where installed apps are registered
 UNINSTALL_KEYS = [
-    (winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall"),
-    (winreg.HKEY_CURRENT_USER, r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall"),
-    (winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\WOW6432Node\Microsoft\Windows\CurrentVersion\Uninstall"),
+    (HKEY_LOCAL_MACHINE, r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall"),
+    (HKEY_CURRENT_USER, r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall"),
+    (HKEY_LOCAL_MACHINE, r"SOFTWARE\WOW6432Node\Microsoft\Windows\CurrentVersion\Uninstall"),
 ]
 
+# Subkeys per work item when enumerating in parallel. winreg releases the
+# GIL inside each registry call, so threads overlap the actual I/O.
+SUBKEY_CHUNK_SIZE = 128
+DEFAULT_MAX_WORKERS = 8
+
+# Per hive: subkey name -> (last-write time, raw entry or None if unnamed)
+HiveCache = Dict[str, Tuple[int, Optional[Dict[str, str]]]]
+# (subkey name, last-write time or None, raw entry or None, reused from cache)
+SubkeyRecord = Tuple[str, Optional[int], Optional[Dict[str, str]], bool]
+
 # Publishers we treat as "trusted" (mapped to installed_from_play_store = True)
 TRUSTED_PUBLISHERS = [
     "Microsoft Corporation",
@@ -39,55 +66,234 @@ SUSPICIOUS_KEYWORDS = [
     "screen",
 ]
 
+# Suspicious keywords that also suggest screen capture (uses_media_projection)
+SCREEN_KEYWORDS = ["screen", "remote", "viewer"]
+
+
+class ScanHeuristics:
+    """
+    The keyword and publisher lists _to_appinfo_dict classifies apps by,
+    compiled once into KeywordMatchers. Screen keywords count as
+    suspicious keywords too.
+    """
+
+    def __init__(
+        self,
+        suspicious_keywords: List[str] = SUSPICIOUS_KEYWORDS,
+        trusted_publishers: List[str] = TRUSTED_PUBLISHERS,
+        screen_keywords: List[str] = SCREEN_KEYWORDS,
+    ) -> None:
+        self.suspicious = KeywordMatcher(list(suspicious_keywords) + list(screen_keywords))
+        self.trusted = KeywordMatcher(trusted_publishers)
+        self.screen = frozenset(self.suspicious.keywords) & frozenset(
+            k.lower() for k in screen_keywords
+        )
+
+    @classmethod
+    def from_file(cls, path: str) -> "ScanHeuristics":
+        """
+        Load lists from a JSON object with any of the keys
+        "suspicious_keywords", "trusted_publishers" and "screen_keywords";
+        missing keys keep the built-in lists.
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(
+            data.get("suspicious_keywords", SUSPICIOUS_KEYWORDS),
+            data.get("trusted_publishers", TRUSTED_PUBLISHERS),
+            data.get("screen_keywords", SCREEN_KEYWORDS),
+        )
+
+
+_HEURISTICS: Optional[ScanHeuristics] = None
+
 
-def _get_reg_value(key, value_name: str):
+def default_heuristics() -> ScanHeuristics:
+    """
+    Heuristics from the JSON file named by SPYSHIELD_HEURISTICS, or the
+    built-in lists. Compiled on first use and shared afterwards.
+    """
+    global _HEURISTICS
+    if _HEURISTICS is None:
+        path = os.environ.get("SPYSHIELD_HEURISTICS")
+        _HEURISTICS = ScanHeuristics.from_file(path) if path else ScanHeuristics()
+    return _HEURISTICS
+
+
+def _backend(reg: Any) -> Any:
+    reg = reg or winreg
+    if reg is None:
+        raise OSError("winreg is not available on this platform")
+    return reg
+
+
+def _get_reg_value(key, value_name: str, reg: Any = None):
     """Safely read a string value from a registry key."""
     try:
-        value, _ = winreg.QueryValueEx(key, value_name)
+        value, _ = _backend(reg).QueryValueEx(key, value_name)
         return str(value)
     except OSError:
         return None
 
 
-def _enum_installed_apps_from_key(root, path: str) -> List[Dict[str, str]]:
-    apps: List[Dict[str, str]] = []
+def _read_uninstall_entry(reg: Any, subkey, subkey_name: str) -> Optional[Dict[str, str]]:
+    """Read one open uninstall subkey; None if it has no visible name."""
+    display_name = _get_reg_value(subkey, "DisplayName", reg)
+    if not display_name:
+        return None  # skip entries without a visible name
+
+    publisher = _get_reg_value(subkey, "Publisher", reg) or ""
+    install_location = _get_reg_value(subkey, "InstallLocation", reg) or ""
+
+    return {
+        "registry_key": subkey_name,
+        "app_name": display_name,
+        "publisher": publisher,
+        "install_location": install_location,
+    }
+
+
+class RegistryScanCache:
+    """
+    Result of the previous registry scan, persisted as JSON: for every
+    uninstall subkey, its last-write time and the entry read from it.
+
+    During a scan with a cache, each subkey's last-write time is checked
+    with a single QueryInfoKey call. Values are only read for new or
+    modified subkeys, and subkeys that disappeared are dropped from the
+    cache. `reused` and `read` count both kinds of subkey in the last scan.
+
+    A hive key's own last-write time (kept in `parents`) only changes when
+    subkeys are added or removed, not when their values are edited. While
+    it is unchanged the subkeys are opened by their cached names, skipping
+    EnumKey, but each one still has its last-write time checked.
+    """
+
+    VERSION = 2
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path
+        self.hives: Dict[str, HiveCache] = {}
+        self.parents: Dict[str, int] = {}
+        self.reused = 0
+        self.read = 0
+
+    @staticmethod
+    def hive_id(root, path: str) -> str:
+        return f"{int(root):#x}:{path}"
+
+    @classmethod
+    def load(cls, path: str) -> "RegistryScanCache":
+        """Load a saved cache; a missing or unreadable file gives an empty one."""
+        cache = cls(path)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == cls.VERSION:
+                cache.hives = {
+                    hive: {name: (lw, entry) for name, (lw, entry) in subkeys.items()}
+                    for hive, subkeys in data["hives"].items()
+                }
+                cache.parents = {hive: int(lw) for hive, lw in data["parents"].items()}
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return cache
+
+    def save(self) -> None:
+        """Write the cache atomically (temp file + rename)."""
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": self.VERSION, "hives": self.hives, "parents": self.parents}, f
+            )
+        os.replace(tmp_path, self.path)
+
+
+def default_registry_cache_path() -> Optional[str]:
+    """
+    Where the registry scan cache lives: SPYSHIELD_REGISTRY_CACHE if set
+    ("off" disables it), else %LOCALAPPDATA%\\SpyShield\\registry_scan.json.
+    """
+    path = os.environ.get("SPYSHIELD_REGISTRY_CACHE")
+    if path is not None:
+        return None if path.lower() == "off" else path
+    base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    return os.path.join(base, "SpyShield", "registry_scan.json")
+
+
+def _key_info(reg: Any, root, path: str) -> Tuple[int, Optional[int]]:
+    """(subkey count, last-write time) of root\\path; (0, None) if missing."""
+    try:
+        with reg.OpenKey(root, path) as key:
+            count, _, last_write = reg.QueryInfoKey(key)
+            return count, last_write
+    except OSError:
+        # key might not exist on some systems
+        return 0, None
+
+
+def _enum_subkey_range(
+    root,
+    path: str,
+    start: int,
+    stop: int,
+    reg: Any = None,
+    cached: Optional[HiveCache] = None,
+    names: Optional[Sequence[str]] = None,
+) -> List[SubkeyRecord]:
+    """
+    Read uninstall subkeys [start, stop) of root\\path, in index order.
+    Opens its own handle so ranges can be read concurrently.
+
+    With `cached` (the previous scan of this hive), a subkey whose
+    last-write time is unchanged is not read again. `names` are the
+    subkey names by index when the hive is known to have the same
+    subkeys as last time; they replace the EnumKey calls.
+    """
+    reg = _backend(reg)
+    records: List[SubkeyRecord] = []
     try:
-        with winreg.OpenKey(root, path) as key:
-            subkey_count = winreg.QueryInfoKey(key)[0]
-            for i in range(subkey_count):
+        with reg.OpenKey(root, path) as key:
+            for i in range(start, stop):
                 try:
-                    subkey_name = winreg.EnumKey(key, i)
-                    with winreg.OpenKey(key, subkey_name) as subkey:
-                        display_name = _get_reg_value(subkey, "DisplayName")
-                        if not display_name:
-                            continue  # skip entries without a visible name
-
-                        publisher = _get_reg_value(subkey, "Publisher") or ""
-                        install_location = _get_reg_value(subkey, "InstallLocation") or ""
-
-                        apps.append(
-                            {
-                                "registry_key": subkey_name,
-                                "app_name": display_name,
-                                "publisher": publisher,
-                                "install_location": install_location,
-                            }
-                        )
+                    subkey_name = names[i] if names is not None else reg.EnumKey(key, i)
+                    with reg.OpenKey(key, subkey_name) as subkey:
+                        last_write = None
+                        if cached is not None:
+                            last_write = reg.QueryInfoKey(subkey)[2]
+                            hit = cached.get(subkey_name)
+                            if hit is not None and hit[0] == last_write:
+                                records.append((subkey_name, last_write, hit[1], True))
+                                continue
+                        entry = _read_uninstall_entry(reg, subkey, subkey_name)
                 except OSError:
                     continue
+                records.append((subkey_name, last_write, entry, False))
     except OSError:
         # key might not exist on some systems
         pass
+    return records
 
-    return apps
 
+def _enum_installed_apps_from_key(root, path: str, reg: Any = None) -> List[Dict[str, str]]:
+    reg = _backend(reg)
+    records = _enum_subkey_range(root, path, 0, _key_info(reg, root, path)[0], reg)
+    return [entry for _, _, entry, _ in records if entry is not None]
 
-def _to_appinfo_dict(app: Dict[str, str]) -> Dict[str, object]:
+
+def _to_appinfo_dict(
+    app: Dict[str, str], heuristics: Optional[ScanHeuristics] = None
+) -> Dict[str, object]:
     """
     Map raw registry app info to the AppInfo-compatible dict.
     We don't have Android-style permissions here, so those stay empty/default.
-    We use some basic heuristics for risk.
+    We use some basic heuristics for risk; the suspicious keywords found in
+    the name are passed on so they show up among the risk reasons.
     """
+    heuristics = heuristics or default_heuristics()
     name = app["app_name"]
     publisher = app.get("publisher", "")
     install_location = app.get("install_location", "")
@@ -97,7 +303,6 @@ def _to_appinfo_dict(app: Dict[str, str]) -> Dict[str, object]:
     pkg_name = registry_key or name.replace(" ", "_").lower()
 
     lower_publisher = publisher.lower()
-    lower_name = name.lower()
     lower_location = install_location.lower()
 
     # Heuristic: treat Microsoft / Windows directory apps as system-ish
@@ -107,24 +312,20 @@ def _to_appinfo_dict(app: Dict[str, str]) -> Dict[str, object]:
     )
 
     # Heuristic: treat known big vendors as "trusted source"
-    installed_from_store = any(
-        trusted.lower() in lower_publisher for trusted in TRUSTED_PUBLISHERS
-    )
+    installed_from_store = heuristics.trusted.search(publisher)
 
-    # Basic suspicion heuristic based on name
-    suspicious = any(keyword in lower_name for keyword in SUSPICIOUS_KEYWORDS)
+    # Basic suspicion heuristic based on name (all keywords, one pass)
+    keywords = heuristics.suspicious.find_all(name)
 
     foreground_score = 0.0
     background_score = 0.0
     uses_media_projection = False
     uses_accessibility_service = False
 
-    if suspicious:
+    if keywords:
         foreground_score = 0.8
         background_score = 0.6
-        uses_media_projection = any(
-            word in lower_name for word in ("screen", "remote", "viewer")
-        )
+        uses_media_projection = any(word in heuristics.screen for word in keywords)
 
     return {
         "package_name": pkg_name,
@@ -138,28 +339,106 @@ def _to_appinfo_dict(app: Dict[str, str]) -> Dict[str, object]:
         "has_overlay_permission": False,
         "foreground_service_usage_score": foreground_score,
         "background_network_usage_score": background_score,
+        "suspicious_keywords": keywords,
         # extra metadata (used only for display / future work)
         "publisher": publisher,
         "install_location": install_location,
     }
 
 
-def get_installed_apps_windows() -> List[Dict[str, object]]:
+def _enum_all_uninstall_keys(
+    reg: Any, max_workers: int, cache: Optional[RegistryScanCache] = None
+) -> List[Dict[str, str]]:
+    """
+    Raw entries of every UNINSTALL_KEYS hive, in the same order a serial
+    walk would produce: hive by hive, subkey index by subkey index.
+    Updates `cache` (if given) to reflect this scan.
+    """
+    Task = Tuple[Any, str, int, int, Optional[HiveCache], Optional[List[str]]]
+    tasks: List[Task] = []
+    parents: Dict[str, int] = {}
+    for root, path in UNINSTALL_KEYS:
+        count, parent_write = _key_info(reg, root, path)
+        cached = names = None
+        if cache is not None:
+            hive_id = RegistryScanCache.hive_id(root, path)
+            cached = cache.hives.get(hive_id, {})
+            # No subkey added or removed since the last scan (which saw
+            # them all): reuse its names instead of enumerating
+            if (
+                parent_write is not None
+                and cache.parents.get(hive_id) == parent_write
+                and len(cached) == count
+            ):
+                names = list(cached)
+            if parent_write is not None:
+                parents[hive_id] = parent_write
+        for start in range(0, count, SUBKEY_CHUNK_SIZE):
+            stop = min(start + SUBKEY_CHUNK_SIZE, count)
+            tasks.append((root, path, start, stop, cached, names))
+
+    if max_workers <= 1 or len(tasks) <= 1:
+        chunks = [
+            _enum_subkey_range(root, path, a, b, reg, c, n) for root, path, a, b, c, n in tasks
+        ]
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = [
+                pool.submit(_enum_subkey_range, root, path, a, b, reg, c, n)
+                for root, path, a, b, c, n in tasks
+            ]
+            # Collect in submission order to keep the serial ordering
+            chunks = [future.result() for future in futures]
+
+    if cache is not None:
+        # Rebuild from what was seen, which drops deleted subkeys
+        hives: Dict[str, HiveCache] = {
+            RegistryScanCache.hive_id(root, path): {} for root, path in UNINSTALL_KEYS
+        }
+        cache.reused = cache.read = 0
+        for (root, path, *_), records in zip(tasks, chunks):
+            hive = hives[RegistryScanCache.hive_id(root, path)]
+            for subkey_name, last_write, entry, reused in records:
+                hive[subkey_name] = (last_write, entry)
+                if reused:
+                    cache.reused += 1
+                else:
+                    cache.read += 1
+        cache.hives = hives
+        cache.parents = parents
+
+    return [entry for records in chunks for _, _, entry, _ in records if entry is not None]
+
+
+def get_installed_apps_windows(
+    reg: Any = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    cache: Optional[RegistryScanCache] = None,
+) -> List[Dict[str, object]]:
     """
     Public function: returns a list of dicts representing installed apps
     in a format that AppInfo.from_dict() understands.
+
+    The hives and their subkey ranges are read on a thread pool; the
+    result (including which duplicate wins) is identical to a serial scan.
+    With a RegistryScanCache, only new or modified subkeys are read; call
+    cache.save() afterwards to persist it for the next scan.
     """
     seen: set[tuple] = set()
     result: List[Dict[str, object]] = []
+    heuristics = default_heuristics()
 
-    for root, path in UNINSTALL_KEYS:
-        for raw_app in _enum_installed_apps_from_key(root, path):
+    with stage("registry"):
+        raw_apps = _enum_all_uninstall_keys(_backend(reg), max_workers, cache)
+
+    with stage("map"):
+        for raw_app in raw_apps:
             key = (raw_app["app_name"], raw_app["publisher"])
             if key in seen:
                 continue  # de-duplicate entries
             seen.add(key)
 
-            mapped = _to_appinfo_dict(raw_app)
+            mapped = _to_appinfo_dict(raw_app, heuristics)
             result.append(mapped)
 
     return result
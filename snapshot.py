@@ -0,0 +1,483 @@
+# snapshot.py
+#
+# Immutable scored-inventory snapshots and a background refresher.
+# Scans run on a worker thread; when a new AppStore is fully built it is
+# published by replacing a single reference, so readers always see either
+# the old or the new snapshot, never a half-built one, and never wait.
+# Snapshots can also be saved to and mapped from a file (snapshot_file.py).
+
+import bisect
+import functools
+import math
+import os
+import threading
+import time
+from array import array
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+from appstore import RISK_LEVELS, AppRow, AppStore
+from delta import ChangeFeed, ScanDelta, diff_stores
+from metrics import SCANS, STAGE_SECONDS, stage
+from permissions import PERMISSIONS, PermissionIndex, iter_bits
+from scan_jobs import DONE, FAILED, RUNNING, ScanJob, ScanJobs
+from sqlite_store import SQLiteApps, SQLiteSnapshot
+from storage import Progress, load_apps
+
+Inventory = Union[AppStore, SQLiteApps]
+# Builds a new inventory, given a storage.Progress callback to report each
+# scored chunk to.
+Loader = Callable[[Optional[Progress]], Inventory]
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    generation: int
+    apps: AppStore
+    built_at: float  # time.time() when the scan finished
+    scan_seconds: float
+    delta: Optional[ScanDelta] = None  # changes since the previous generation
+    # True for the interim snapshots published while the first scan is
+    # still running: the apps scored so far, not the whole inventory.
+    partial: bool = False
+
+    # Derived once per snapshot (see __post_init__), so list views never sort.
+    # ranking: row numbers by descending risk score (ties keep load order)
+    ranking: array = field(init=False, repr=False, compare=False)
+    level_rankings: Dict[str, array] = field(init=False, repr=False, compare=False)
+    level_counts: Dict[str, int] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        with stage("index"):
+            scores = self.apps.risk_score
+            ranking = array(
+                "I", sorted(range(len(scores)), key=scores.__getitem__, reverse=True)
+            )
+
+            by_level: Dict[str, array] = {level: array("I") for level in RISK_LEVELS}
+            codes = self.apps.risk_level
+            for row in ranking:
+                by_level[RISK_LEVELS[codes[row]]].append(row)
+
+        # frozen dataclass: derived fields are set once, here
+        object.__setattr__(self, "ranking", ranking)
+        object.__setattr__(self, "level_rankings", by_level)
+        object.__setattr__(
+            self, "level_counts", {level: len(rows) for level, rows in by_level.items()}
+        )
+
+    def count(self, level: Optional[str] = None) -> int:
+        """Number of apps, optionally only those of one risk level."""
+        if level is None:
+            return len(self.ranking)
+        return self.level_counts.get(level, 0)
+
+    def page(self, level: Optional[str] = None, offset: int = 0, limit: int = 100) -> List[AppRow]:
+        """One page of apps in ranking order, optionally for one risk level."""
+        rows = self.ranking if level is None else self.level_rankings.get(level, array("I"))
+        return [self.apps.row(row) for row in rows[offset : offset + limit]]
+
+    def top(
+        self, k: int, level: Optional[str] = None, min_score: Optional[float] = None
+    ) -> List[AppRow]:
+        """
+        The k riskiest apps, optionally of one level and only those scoring
+        at least min_score. Read off the ranking: O(k + log n).
+        """
+        rows = self.ranking if level is None else self.level_rankings.get(level, array("I"))
+        end = k
+        if min_score is not None:
+            scores = self.apps.risk_score
+            # ranking is sorted by descending score
+            end = min(k, bisect.bisect_right(rows, -min_score, key=lambda r: -scores[r]))
+        return [self.apps.row(row) for row in rows[:end]]
+
+    @functools.cached_property
+    def permission_index(self) -> PermissionIndex:
+        """Which rows hold which permissions; built on first use."""
+        # Permission tuples are shared between apps: mask each once
+        masks: Dict[Tuple[str, ...], int] = {}
+        index = PermissionIndex()
+        for perms in self.apps.permissions:
+            mask = masks.get(perms)
+            if mask is None:
+                mask = masks[perms] = PERMISSIONS.mask(perms)
+            index.add(mask)
+        return index
+
+    def ranked(
+        self,
+        level: Optional[str],
+        flags: Mapping[str, int],
+        cursor: Optional[Dict[str, Any]],
+        limit: int,
+        permissions: Sequence[str] = (),
+    ) -> Tuple[List[AppRow], Optional[Dict[str, Any]]]:
+        """
+        Up to `limit` apps in ranking order that match the flag filters
+        (flag name -> 0/1) and hold every one of `permissions`, continuing
+        after `cursor`. Returns the apps and the cursor for the next page
+        (None on the last page). Cursors are plain dicts so the API can
+        serialize them; a malformed one raises ValueError, KeyError or
+        TypeError.
+        """
+        ranking = self.ranking if level is None else self.level_rankings[level]
+        position = self._resume_position(ranking, cursor) if cursor is not None else 0
+
+        columns = [(self.apps.flags[name], wanted) for name, wanted in flags.items()]
+        holders = None
+        if permissions:
+            holders = set(iter_bits(self.permission_index.rows_with_all(*permissions)))
+        apps: List[AppRow] = []
+        last_row = -1
+        while position < len(ranking) and len(apps) < limit:
+            row = ranking[position]
+            position += 1
+            if holders is not None and row not in holders:
+                continue
+            if all(column[row] == wanted for column, wanted in columns):
+                apps.append(self.apps.row(row))
+                last_row = row
+
+        if position >= len(ranking) or last_row < 0:
+            return apps, None
+        return apps, {
+            "g": self.generation,
+            "i": position,
+            "s": self.apps.risk_score[last_row],
+            "p": self.apps.package_name[last_row],
+        }
+
+    def _resume_position(self, ranking: array, cursor: Dict[str, Any]) -> int:
+        """
+        Position in `ranking` right after the cursor's last app.
+
+        Same generation: the stored position is exact. After a rescan, resume
+        by score instead: after the last app if it is still among the apps
+        with the same score, else at the first of them (apps may repeat, but
+        none are skipped).
+        """
+        if int(cursor["g"]) == self.generation:
+            position = int(cursor["i"])
+            if not 0 <= position <= len(ranking):
+                raise ValueError(f"Cursor position out of range: {position}")
+            return position
+
+        score, package_name = float(cursor["s"]), str(cursor["p"])
+        if not math.isfinite(score):
+            raise ValueError(f"Cursor score is not finite: {score}")
+        scores = self.apps.risk_score
+        # ranking is sorted by descending score
+        first = bisect.bisect_left(ranking, -score, key=lambda r: -scores[r])
+        after = bisect.bisect_right(ranking, -score, key=lambda r: -scores[r])
+        for position in range(first, after):
+            if self.apps.package_name[ranking[position]] == package_name:
+                return position + 1
+        return first
+
+
+# What SnapshotRefresher.current may hold: in-memory, or SQL-backed when
+# load_apps writes to a SPYSHIELD_DB database.
+AnySnapshot = Union[Snapshot, SQLiteSnapshot]
+
+
+def _default_loader(progress: Optional[Progress] = None) -> Inventory:
+    return load_apps(progress=progress)
+
+
+class SnapshotRefresher:
+    """
+    Owns the current Snapshot and rebuilds it off the request path.
+
+    Every scan is a ScanJob (scan_jobs.py) that clients can poll by id.
+    - request_refresh() queues a job for the worker thread and returns it
+      immediately. Requests arriving while a job is queued share it; a
+      request arriving during a scan queues exactly one follow-up job.
+    - refresh_now() runs a scan on the calling thread instead.
+    - With an interval, the worker also rescans periodically.
+    - Until the first scan completes, each time the number of scored apps
+      doubles, a partial snapshot of them is published, so front ends can
+      show the first batch right away. Later scans keep serving the last
+      complete snapshot until they finish.
+    - With a snapshot_path, every complete in-memory snapshot is also
+      written to that file, and load_file() maps it back at startup
+      instead of scanning.
+    """
+
+    def __init__(
+        self,
+        loader: Loader = _default_loader,
+        interval: Optional[float] = None,
+        snapshot_path: Optional[str] = None,
+    ):
+        self._loader = loader
+        self._interval = interval if interval and interval > 0 else None
+        self._snapshot_path = snapshot_path
+        self._wake = threading.Event()
+        self._scan_lock = threading.Lock()
+        self._jobs_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._listeners: List[Callable[[AnySnapshot], None]] = []
+        self._scanning = False
+        self._queued: Optional[ScanJob] = None
+        self.jobs = ScanJobs()
+        self.feed = ChangeFeed()
+        self._current: AnySnapshot = Snapshot(
+            generation=0, apps=AppStore(), built_at=0.0, scan_seconds=0.0
+        )
+        # Last complete snapshot: the base for diffs
+        self._complete: Optional[AnySnapshot] = None
+
+    @property
+    def current(self) -> AnySnapshot:
+        return self._current
+
+    @property
+    def scanning(self) -> bool:
+        return self._scanning
+
+    def add_listener(self, callback: Callable[[AnySnapshot], None]) -> None:
+        """Call callback(snapshot) after every swap (on the worker thread)."""
+        self._listeners.append(callback)
+
+    def load_file(self) -> bool:
+        """
+        Serve the snapshot saved at snapshot_path, if there is a readable
+        one. It is memory-mapped, not parsed, so this takes milliseconds
+        whatever its size. Returns False when a scan is needed instead.
+        """
+        if not self._snapshot_path or not os.path.exists(self._snapshot_path):
+            return False
+        from snapshot_file import load_snapshot_file
+
+        try:
+            snapshot = load_snapshot_file(self._snapshot_path)
+        except (OSError, ValueError) as exc:
+            print("[SpyShield] Could not load saved snapshot; scanning instead.")
+            print("Error:", exc)
+            return False
+        self._current = self._complete = snapshot
+        print(
+            f"[SpyShield] Serving saved snapshot {self._snapshot_path} "
+            f"(generation {snapshot.generation}, {len(snapshot.apps)} apps)."
+        )
+        return True
+
+    def _save_file(self, snapshot: Snapshot) -> None:
+        from snapshot_file import write_snapshot_file
+
+        try:
+            with stage("save"):
+                write_snapshot_file(snapshot, self._snapshot_path)
+        except OSError as exc:
+            print("[SpyShield] Could not save snapshot file:", exc)
+
+    def _publish(self, snapshot: AnySnapshot) -> None:
+        # Single reference assignment: the atomic swap.
+        self._current = snapshot
+        for callback in self._listeners:
+            callback(snapshot)
+
+    def refresh_now(self, job: Optional[ScanJob] = None) -> AnySnapshot:
+        """Scan on the calling thread and swap the result in."""
+        if job is None:
+            job = self.jobs.create("request")
+        with self._scan_lock:
+            self._scanning = True
+            job.state, job.started_at = RUNNING, time.time()
+            start = time.perf_counter()
+            previous = self._complete
+            next_partial = 1
+
+            def progress(scored: int, total: Optional[int], store: Optional[AppStore]) -> None:
+                nonlocal next_partial
+                job.scored, job.total = scored, total
+                if previous is not None or store is None or scored < next_partial:
+                    return
+                if total is not None and scored >= total:
+                    return  # the complete snapshot follows right away
+                # Doubling keeps the copying and ranking linear overall
+                next_partial = scored * 2
+                partial = Snapshot(
+                    generation=self._current.generation + 1,
+                    apps=store.copy(),
+                    built_at=time.time(),
+                    scan_seconds=time.perf_counter() - start,
+                    partial=True,
+                )
+                job.generation = partial.generation
+                self._publish(partial)
+
+            try:
+                apps = self._loader(progress)
+                elapsed = time.perf_counter() - start
+                STAGE_SECONDS.observe(elapsed, "scan")
+                SCANS.inc(1, "ok")
+                generation = self._current.generation + 1
+                delta = None
+                if isinstance(apps, SQLiteApps):
+                    snapshot: AnySnapshot = SQLiteSnapshot(
+                        generation=generation,
+                        apps=apps,
+                        built_at=time.time(),
+                        scan_seconds=elapsed,
+                    )
+                else:
+                    if previous is not None and not isinstance(previous.apps, SQLiteApps):
+                        delta = diff_stores(previous.apps, apps)
+                    snapshot = Snapshot(
+                        generation=generation,
+                        apps=apps,
+                        built_at=time.time(),
+                        scan_seconds=elapsed,
+                        delta=delta,
+                    )
+                self._complete = snapshot
+                self._current = snapshot
+                if self._snapshot_path and isinstance(snapshot, Snapshot):
+                    self._save_file(snapshot)
+                job.scored = len(apps)
+                job.generation = snapshot.generation
+                job.state = DONE
+            except Exception as exc:
+                SCANS.inc(1, "failed")
+                job.state, job.error = FAILED, f"{type(exc).__name__}: {exc}"
+                raise
+            finally:
+                job.finished_at = time.time()
+                self._scanning = False
+
+        if delta is not None:
+            self.feed.publish(delta)
+        for callback in self._listeners:
+            callback(snapshot)
+        return snapshot
+
+    def request_refresh(self, reason: str = "request") -> ScanJob:
+        """Queue a rescan for the worker and return its job, without waiting."""
+        with self._jobs_lock:
+            if self._queued is None:
+                self._queued = self.jobs.create(reason)
+            job = self._queued
+        self._wake.set()
+        return job
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="spyshield-refresher", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(timeout=self._interval)
+            # Take the queued job before scanning: requests made during the
+            # scan queue a new job and cause one more scan, not one each.
+            with self._jobs_lock:
+                self._wake.clear()
+                job, self._queued = self._queued, None
+            try:
+                snapshot = self.refresh_now(job or self.jobs.create("interval"))
+                print(
+                    f"[SpyShield] Rescan finished: generation {snapshot.generation}, "
+                    f"{len(snapshot.apps)} apps in {snapshot.scan_seconds:.2f}s."
+                )
+            except Exception as exc:
+                print("[SpyShield] Background rescan failed; keeping previous snapshot.")
+                print("Error:", exc)
+
+
+def rescan_request_path(snapshot_path: str) -> str:
+    """File a follower creates to ask the publisher for a rescan."""
+    return snapshot_path + ".rescan"
+
+
+def scan_error_path(snapshot_path: str) -> str:
+    """File holding the publisher's error while its last scan has failed."""
+    return snapshot_path + ".error"
+
+
+class SnapshotFollower:
+    """
+    Read-only counterpart of SnapshotRefresher for web worker processes.
+
+    It never scans: it serves the snapshot file that one publisher process
+    (publisher.py) keeps up to date. At most every `poll` seconds a read of
+    `current` stats the file; when the publisher has replaced it with a
+    new generation, the new file is mapped and swapped in. Rows are read
+    from the shared page cache, so a worker's memory does not grow with
+    the inventory.
+    """
+
+    def __init__(self, snapshot_path: str, poll: float = 1.0):
+        self._path = snapshot_path
+        self._poll = poll
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[AnySnapshot], None]] = []
+        self._stamp: Optional[Tuple[int, int, int]] = None
+        self._next_check = 0.0
+        self._current: AnySnapshot = Snapshot(
+            generation=0, apps=AppStore(), built_at=0.0, scan_seconds=0.0
+        )
+
+    @property
+    def current(self) -> AnySnapshot:
+        if time.monotonic() >= self._next_check:
+            self._check()
+        return self._current
+
+    @property
+    def scanning(self) -> bool:
+        """True while a rescan request is waiting for the publisher."""
+        return os.path.exists(rescan_request_path(self._path))
+
+    @property
+    def scan_error(self) -> Optional[str]:
+        """The publisher's error if its last scan failed, else None."""
+        try:
+            with open(scan_error_path(self._path), encoding="utf-8") as f:
+                return f.read().strip() or "unknown error"
+        except FileNotFoundError:
+            return None
+
+    def add_listener(self, callback: Callable[[AnySnapshot], None]) -> None:
+        """Call callback(snapshot) after every swap (on the request thread)."""
+        self._listeners.append(callback)
+
+    def request_refresh(self) -> None:
+        """Ask the publisher for a rescan; it polls for the request file."""
+        with open(rescan_request_path(self._path), "a"):
+            pass
+
+    def _check(self) -> None:
+        from snapshot_file import load_snapshot_file
+
+        with self._lock:
+            now = time.monotonic()
+            if now < self._next_check:
+                return
+            self._next_check = now + self._poll
+            try:
+                st = os.stat(self._path)
+            except OSError:
+                return  # nothing published yet
+            # The publisher replaces the file atomically, so a new
+            # generation always shows up as a new inode.
+            stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+            if stamp == self._stamp:
+                return
+            try:
+                snapshot = load_snapshot_file(self._path)
+            except (OSError, ValueError) as exc:
+                print("[SpyShield] Could not map published snapshot; keeping previous one.")
+                print("Error:", exc)
+                return
+            self._stamp = stamp
+            if snapshot.generation == self._current.generation:
+                return
+            self._current = snapshot
+
+        for callback in self._listeners:
+            callback(snapshot)
@@ -0,0 +1,424 @@
+# snapshot_file.py
+#
+# Compact binary file format for a scored snapshot, read through mmap.
+#
+# Layout (native little-endian, sections 8-byte aligned):
+#
+#   header     magic, version, generation, apps, built_at, scan_seconds,
+#              offset of the section directory
+#   sections   one fixed-width array per column (scores, usage, flags,
+#              level codes, string/tuple ids), the string table
+#              (offsets + UTF-8 bytes), the tuple table (permission and
+#              reason code lists as string ids), the precomputed rankings, and
+#              an open-addressing package_name -> row index
+#   directory  (name, offset, length) for every section
+#
+# Loading maps the file and wraps each section in a memoryview; nothing is
+# parsed or copied up front, so startup time does not depend on the size
+# of the inventory, and every process mapping the same file shares one
+# copy in the page cache. Values are decoded on access.
+#
+# Every generation is written to its own data file next to `path`, and
+# `path` itself is a small pointer file naming the current one, swapped
+# with os.replace. A data file is never replaced while mapped (Windows
+# refuses that); stale ones are removed once nothing maps them.
+
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from array import array
+from collections.abc import Sequence
+from typing import Any, BinaryIO, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from appstore import EXTRA_FIELDS, FLAG_FIELDS, RISK_LEVELS, USAGE_FIELDS, AppRow
+from models import render_reasons
+from snapshot import Snapshot
+
+MAGIC = b"SPYSNAP\x01"
+VERSION = 3
+# magic, version, generation, apps, built_at, scan_seconds, directory offset
+_HEADER = struct.Struct("<8sIQQddQ")
+# section name, offset, length
+_ENTRY = struct.Struct("<32sQQ")
+DATA_SUFFIX = ".data"
+
+
+def _package_hash(package_name: str) -> int:
+    return zlib.crc32(package_name.encode("utf-8"))
+
+
+class _Writer:
+    """Appends 8-byte-aligned sections to a file and records where they are."""
+
+    def __init__(self, f: BinaryIO) -> None:
+        self.f = f
+        self.sections: List[Tuple[str, int, int]] = []
+
+    def section(self, name: str, data: Any) -> None:
+        if len(name.encode()) > 32:
+            raise ValueError(f"Section name too long: {name}")
+        raw = data if isinstance(data, bytes) else memoryview(data).cast("B")
+        offset = self.f.tell()
+        self.f.write(raw)
+        self.sections.append((name, offset, len(raw)))
+        self.f.write(b"\0" * (-self.f.tell() % 8))
+
+    def directory(self) -> int:
+        offset = self.f.tell()
+        self.f.write(struct.pack("<I", len(self.sections)))
+        for name, start, length in self.sections:
+            self.f.write(_ENTRY.pack(name.encode(), start, length))
+        return offset
+
+
+def snapshot_data_path(path: str) -> str:
+    """Data file the pointer file at path currently names."""
+    with open(path, "rb") as f:
+        head = f.read(4096)
+    if head.startswith(MAGIC):
+        raise ValueError(f"{path} is a snapshot file from an older version")
+    name = head.decode("utf-8", "replace").strip()
+    if not name or os.path.basename(name) != name:
+        raise ValueError(f"{path} is not a SpyShield snapshot pointer")
+    return os.path.join(os.path.dirname(os.path.abspath(path)), name)
+
+
+def _replace_pointer(path: str, data_path: str) -> None:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(os.path.basename(data_path))
+    for attempt in range(5):
+        try:
+            os.replace(tmp_path, path)
+            return
+        except PermissionError:
+            # Windows: a reader has the pointer open for a moment
+            if attempt == 4:
+                raise
+            time.sleep(0.05)
+
+
+def _remove_stale_data(path: str, keep: Tuple[str, ...]) -> None:
+    directory, base = os.path.split(os.path.abspath(path))
+    for name in os.listdir(directory):
+        if not (name.startswith(base + ".") and name.endswith(DATA_SUFFIX)):
+            continue
+        data_path = os.path.join(directory, name)
+        if data_path in keep:
+            continue
+        try:
+            os.remove(data_path)
+        except OSError:
+            pass  # still mapped somewhere (Windows); retried on the next write
+
+
+def write_snapshot_file(snapshot: Snapshot, path: str) -> None:
+    """
+    Write snapshot to a new data file and point path at it (atomically:
+    readers mapping the old data file keep seeing it until they remap).
+    The previous data file is kept for followers still switching over.
+    """
+    store = snapshot.apps
+    n = len(store)
+
+    strings: Dict[str, int] = {}
+    str_offsets = array("Q", [0, 0])  # id 0 is "absent"
+    str_data = bytearray()
+
+    def string_id(value: Optional[str]) -> int:
+        if value is None:
+            return 0
+        code = strings.get(value)
+        if code is None:
+            code = strings[value] = len(str_offsets) - 1
+            str_data.extend(value.encode("utf-8"))
+            str_offsets.append(len(str_data))
+        return code
+
+    tuples: Dict[Tuple[str, ...], int] = {}
+    tuple_offsets = array("I", [0])
+    tuple_items = array("I")
+
+    def tuple_id(values: Tuple[str, ...]) -> int:
+        code = tuples.get(values)
+        if code is None:
+            code = tuples[values] = len(tuple_offsets) - 1
+            tuple_items.extend(string_id(v) for v in values)
+            tuple_offsets.append(len(tuple_items))
+        return code
+
+    package_ids = array("I", (string_id(p) for p in store.package_name))
+    app_name_ids = array("I", (string_id(a) for a in store.app_name))
+    permission_ids = array("I", (tuple_id(tuple(p)) for p in store.permissions))
+    code_ids = array("I", (tuple_id(tuple(c)) for c in store.risk_codes))
+    extras = {
+        name: array("I", (string_id(store.value(row, name)) for row in range(n)))
+        for name in EXTRA_FIELDS
+    }
+
+    # package_name -> row + 1 (0 = empty slot), linear probing, load <= 0.5
+    slots = 1
+    while slots < 2 * n:
+        slots <<= 1
+    index = array("I", bytes(4 * slots))
+    mask = slots - 1
+    for row, package_name in enumerate(store.package_name):
+        slot = _package_hash(package_name) & mask
+        while index[slot]:
+            slot = (slot + 1) & mask
+        index[slot] = row + 1
+
+    level_ranking = array("I")
+    level_starts = array("I", [0])
+    for level in RISK_LEVELS:
+        level_ranking.extend(snapshot.level_rankings[level])
+        level_starts.append(len(level_ranking))
+
+    directory, base = os.path.split(os.path.abspath(path))
+    fd, data_path = tempfile.mkstemp(
+        prefix=f"{base}.{snapshot.generation}.", suffix=DATA_SUFFIX, dir=directory
+    )
+    with os.fdopen(fd, "wb") as f:
+        f.write(b"\0" * _HEADER.size)
+        f.write(b"\0" * (-f.tell() % 8))
+        out = _Writer(f)
+        out.section("risk_score", store.risk_score)
+        out.section("risk_level", store.risk_level)
+        for name in USAGE_FIELDS:
+            out.section(name, store.usage[name])
+        for name in FLAG_FIELDS:
+            out.section(name, store.flags[name])
+        out.section("package_name", package_ids)
+        out.section("app_name", app_name_ids)
+        out.section("permissions", permission_ids)
+        out.section("risk_codes", code_ids)
+        for name, ids in extras.items():
+            out.section(name, ids)
+        out.section("str_offsets", str_offsets)
+        out.section("str_data", bytes(str_data))
+        out.section("tuple_offsets", tuple_offsets)
+        out.section("tuple_items", tuple_items)
+        out.section("ranking", array("I", snapshot.ranking))
+        out.section("level_ranking", level_ranking)
+        out.section("level_starts", level_starts)
+        out.section("index", index)
+        directory = out.directory()
+        f.seek(0)
+        f.write(
+            _HEADER.pack(
+                MAGIC,
+                VERSION,
+                snapshot.generation,
+                n,
+                snapshot.built_at,
+                snapshot.scan_seconds,
+                directory,
+            )
+        )
+    try:
+        previous = snapshot_data_path(path)
+    except (OSError, ValueError):
+        previous = ""
+    _replace_pointer(path, data_path)
+    _remove_stale_data(path, (data_path, previous))
+
+
+class _StringTable:
+    """Lazy view of the file's string table; id 0 is None."""
+
+    def __init__(self, offsets: memoryview, data: memoryview) -> None:
+        self._offsets = offsets
+        self._data = data
+
+    def value(self, code: int) -> Optional[str]:
+        if code == 0:
+            return None
+        return str(self._data[self._offsets[code] : self._offsets[code + 1]], "utf-8")
+
+
+class _StringColumn(Sequence):
+    """Column of string ids, decoded per access."""
+
+    def __init__(self, ids: memoryview, strings: _StringTable) -> None:
+        self._ids = ids
+        self._strings = strings
+
+    def __getitem__(self, row: int) -> Optional[str]:
+        return self._strings.value(self._ids[row])
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __iter__(self) -> Iterator[Optional[str]]:
+        value = self._strings.value
+        for code in self._ids:
+            yield value(code)
+
+
+class _TupleColumn(Sequence):
+    """Column of tuple ids (permission or reason lists), decoded per access."""
+
+    def __init__(
+        self, ids: memoryview, offsets: memoryview, items: memoryview, strings: _StringTable
+    ) -> None:
+        self._ids = ids
+        self._offsets = offsets
+        self._items = items
+        self._strings = strings
+
+    def __getitem__(self, row: int) -> Tuple[str, ...]:
+        code = self._ids[row]
+        items = self._items[self._offsets[code] : self._offsets[code + 1]]
+        return tuple(self._strings.value(item) for item in items)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+class MappedInventory(Mapping[str, AppRow]):
+    """
+    Read-only AppStore look-alike over a memory-mapped snapshot file: the
+    same column attributes (as memoryviews or lazy sequences), value(),
+    row() and row_of(), so Snapshot, the API and diffs work on it
+    unchanged.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Map the data file at path (see snapshot_data_path)."""
+        if sys.byteorder != "little":
+            raise ValueError("Snapshot files are little-endian")
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mmap)
+
+        magic, version, generation, n, built_at, scan_seconds, directory = (
+            _HEADER.unpack_from(buf)
+        )
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a SpyShield snapshot file (version {VERSION})")
+        self.generation = generation
+        self.built_at = built_at
+        self.scan_seconds = scan_seconds
+
+        (count,) = struct.unpack_from("<I", buf, directory)
+        sections: Dict[str, memoryview] = {}
+        for i in range(count):
+            name, offset, length = _ENTRY.unpack_from(buf, directory + 4 + i * _ENTRY.size)
+            sections[name.rstrip(b"\0").decode()] = buf[offset : offset + length]
+        if len(sections["risk_score"]) != 8 * n:
+            raise ValueError(f"{path} is truncated or corrupt")
+        self._sections = sections
+
+        self.risk_score = sections["risk_score"].cast("d")
+        self.risk_level = sections["risk_level"].cast("b")
+        self.usage = {name: sections[name].cast("d") for name in USAGE_FIELDS}
+        self.flags = {name: sections[name].cast("B") for name in FLAG_FIELDS}
+
+        self.strings = _StringTable(
+            sections["str_offsets"].cast("Q"), sections["str_data"]
+        )
+        self.package_name = _StringColumn(sections["package_name"].cast("I"), self.strings)
+        self.app_name = _StringColumn(sections["app_name"].cast("I"), self.strings)
+        tuple_offsets = sections["tuple_offsets"].cast("I")
+        tuple_items = sections["tuple_items"].cast("I")
+        self.permissions = _TupleColumn(
+            sections["permissions"].cast("I"), tuple_offsets, tuple_items, self.strings
+        )
+        self.risk_codes = _TupleColumn(
+            sections["risk_codes"].cast("I"), tuple_offsets, tuple_items, self.strings
+        )
+        self.extras = {name: sections[name].cast("I") for name in EXTRA_FIELDS}
+        self._index = sections["index"].cast("I")
+
+    def section(self, name: str, fmt: str = "B") -> memoryview:
+        return self._sections[name].cast(fmt)
+
+    # ---------- reading (same contract as AppStore) ----------
+
+    def value(self, row: int, key: str) -> Any:
+        if key in self.flags:
+            return bool(self.flags[key][row])
+        if key in self.usage:
+            return self.usage[key][row]
+        if key == "risk_score":
+            return self.risk_score[row]
+        if key == "risk_level":
+            return RISK_LEVELS[self.risk_level[row]]
+        if key in self.extras:
+            return self.strings.value(self.extras[key][row])
+        if key == "risk_reasons":
+            return render_reasons(self.risk_codes[row])
+        if key in ("package_name", "app_name", "permissions"):
+            return getattr(self, key)[row]
+        raise KeyError(key)
+
+    def row(self, row: int) -> AppRow:
+        return AppRow(self, row)
+
+    def rows(self) -> Iterator[AppRow]:
+        for row in range(len(self)):
+            yield AppRow(self, row)
+
+    def row_of(self, package_name: str) -> int:
+        """Row number of package_name, or -1 if absent."""
+        index = self._index
+        mask = len(index) - 1
+        slot = _package_hash(package_name) & mask
+        while True:
+            entry = index[slot]
+            if entry == 0:
+                return -1
+            if self.package_name[entry - 1] == package_name:
+                return entry - 1
+            slot = (slot + 1) & mask
+
+    def __getitem__(self, package_name: str) -> AppRow:
+        row = self.row_of(package_name)
+        if row < 0:
+            raise KeyError(package_name)
+        return AppRow(self, row)
+
+    def __contains__(self, package_name: object) -> bool:
+        return isinstance(package_name, str) and self.row_of(package_name) >= 0
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.package_name)
+
+    def __len__(self) -> int:
+        return len(self.risk_score)
+
+
+class MappedSnapshot(Snapshot):
+    """
+    Snapshot over a MappedInventory. The rankings and level counts come
+    from the file instead of being recomputed, so creating one is O(1).
+    """
+
+    def __post_init__(self) -> None:
+        ranking = self.apps.section("ranking", "I")
+        level_ranking = self.apps.section("level_ranking", "I")
+        starts = self.apps.section("level_starts", "I")
+        by_level = {
+            level: level_ranking[starts[i] : starts[i + 1]] for i, level in enumerate(RISK_LEVELS)
+        }
+        object.__setattr__(self, "ranking", ranking)
+        object.__setattr__(self, "level_rankings", by_level)
+        object.__setattr__(
+            self, "level_counts", {level: len(rows) for level, rows in by_level.items()}
+        )
+
+
+def load_snapshot_file(path: str) -> MappedSnapshot:
+    """Map the snapshot path points to (raises OSError/ValueError)."""
+    apps = MappedInventory(snapshot_data_path(path))
+    return MappedSnapshot(
+        generation=apps.generation,
+        apps=apps,
+        built_at=apps.built_at,
+        scan_seconds=apps.scan_seconds,
+    )
@@ -0,0 +1,488 @@
+# sqlite_store.py
+#
+# Optional persistent backend: scored inventories in a SQLite database
+# (WAL mode), enabled with SPYSHIELD_DB=/path/to/spyshield.db.
+#
+# Every scan is written as a new generation, in batched transactions, and
+# only becomes visible once it is complete (one small commit flips the
+# current generation). Readers page, filter and look up apps with indexed
+# SQL queries instead of holding every row in Python. The last
+# SPYSHIELD_DB_KEEP (default 2) scans are kept for history queries.
+
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from appstore import EXTRA_FIELDS, FLAG_FIELDS, RISK_LEVELS, ROW_FIELDS, USAGE_FIELDS
+from models import render_reasons
+from storage import INGEST_CHUNK_SIZE, iter_scored_chunks
+
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_KEEP_GENERATIONS = 2
+# PRAGMA user_version of the current schema. A database written with an
+# older one is rebuilt (it only holds scan results, and the next scan
+# repopulates it).
+SCHEMA_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scans (
+    generation INTEGER PRIMARY KEY,
+    finished_at REAL NOT NULL,
+    apps INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS apps (
+    generation INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    package_name TEXT NOT NULL,
+    app_name TEXT NOT NULL,
+    permissions TEXT NOT NULL,
+    is_system_app INTEGER NOT NULL,
+    has_launcher_icon INTEGER NOT NULL,
+    installed_from_play_store INTEGER NOT NULL,
+    uses_accessibility_service INTEGER NOT NULL,
+    uses_media_projection INTEGER NOT NULL,
+    has_overlay_permission INTEGER NOT NULL,
+    foreground_service_usage_score REAL NOT NULL,
+    background_network_usage_score REAL NOT NULL,
+    risk_score REAL NOT NULL,
+    risk_level TEXT NOT NULL,
+    risk_codes TEXT NOT NULL,
+    publisher TEXT,
+    install_location TEXT,
+    PRIMARY KEY (generation, package_name)
+);
+CREATE INDEX IF NOT EXISTS apps_by_score ON apps (generation, risk_score DESC, seq);
+CREATE INDEX IF NOT EXISTS apps_by_level ON apps (generation, risk_level, risk_score DESC, seq);
+"""
+
+_COLUMNS: Tuple[str, ...] = (
+    ("package_name", "app_name", "permissions")
+    + FLAG_FIELDS
+    + USAGE_FIELDS
+    + ("risk_score", "risk_level", "risk_codes")
+    + EXTRA_FIELDS
+)
+_SELECT = ", ".join(_COLUMNS)
+
+# Same package twice in one scan: last one wins, first position kept
+# (the AppStore semantics).
+_UPSERT = (
+    f"INSERT INTO apps (generation, seq, {_SELECT}) "
+    f"VALUES ({', '.join('?' * (len(_COLUMNS) + 2))}) "
+    f"ON CONFLICT (generation, package_name) DO UPDATE SET "
+    + ", ".join(f"{name} = excluded.{name}" for name in _COLUMNS[1:])
+)
+
+
+class SQLiteRow(Mapping[str, Any]):
+    """
+    One apps row in the same shape as an AppRow. Reasons are kept as codes
+    and only rendered when risk_reasons is read, so list pages never pay
+    for them.
+    """
+
+    __slots__ = ("_fields", "_codes")
+
+    def __init__(self, row: sqlite3.Row) -> None:
+        fields: Dict[str, Any] = {
+            "package_name": row["package_name"],
+            "app_name": row["app_name"],
+            "permissions": tuple(json.loads(row["permissions"])),
+        }
+        for name in FLAG_FIELDS:
+            fields[name] = bool(row[name])
+        for name in USAGE_FIELDS:
+            fields[name] = row[name]
+        fields["risk_score"] = row["risk_score"]
+        fields["risk_level"] = row["risk_level"]
+        for name in EXTRA_FIELDS:
+            if row[name] is not None:
+                fields[name] = row[name]
+        self._fields = fields
+        self._codes: Tuple[str, ...] = tuple(json.loads(row["risk_codes"]))
+
+    @property
+    def risk_codes(self) -> Tuple[str, ...]:
+        return self._codes
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "risk_reasons":
+            return render_reasons(self._codes)
+        return self._fields[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from ROW_FIELDS
+        for name in EXTRA_FIELDS:
+            if name in self._fields:
+                yield name
+
+    def __len__(self) -> int:
+        return len(self._fields) + 1
+
+    def __repr__(self) -> str:
+        return f"SQLiteRow({self._fields['package_name']!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        info = dict(self.items())
+        info["permissions"] = list(info["permissions"])
+        info["risk_reasons"] = list(info["risk_reasons"])
+        return info
+
+
+class SQLiteInventory:
+    """
+    A SPYSHIELD_DB database file. Writes (ingest) are serialized on one
+    connection; every reading thread gets its own connection, so queries
+    run concurrently with each other and with an ingest.
+    """
+
+    def __init__(self, path: str, keep_generations: int = DEFAULT_KEEP_GENERATIONS):
+        self.path = path
+        self.keep_generations = max(1, keep_generations)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._writer = self._connect(check_same_thread=False)
+        self._migrate()
+
+    def _migrate(self) -> None:
+        conn = self._writer
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'apps'").fetchone():
+                print(f"[SpyShield] Rebuilding {self.path} (old schema version {version}).")
+                conn.executescript(
+                    "DROP TABLE IF EXISTS apps; DROP TABLE IF EXISTS scans; "
+                    "DROP TABLE IF EXISTS meta;"
+                )
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.executescript(_SCHEMA)
+
+    def _connect(self, check_same_thread: bool = True) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=check_same_thread)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL: durable at checkpoints, no fsync per transaction
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def reader(self) -> sqlite3.Connection:
+        """This thread's read connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def current_generation(self) -> int:
+        row = self.reader().execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        return row[0] if row else 0
+
+    def generations(self) -> List[Tuple[int, float, int]]:
+        """(generation, finished_at, apps) for every stored scan, oldest first."""
+        return [
+            tuple(row)
+            for row in self.reader().execute(
+                "SELECT generation, finished_at, apps FROM scans ORDER BY generation"
+            )
+        ]
+
+    def ingest(
+        self,
+        records: Iterable[dict],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        on_chunk: Optional[Callable[[int], None]] = None,
+    ) -> int:
+        """
+        Score records and store them as a new generation, one transaction
+        per batch_size apps. The generation is published (and old ones
+        pruned) in a final transaction; returns its number.
+        on_chunk(scored) is called after each scored chunk.
+        """
+        with self._write_lock:
+            conn = self._writer
+            row = conn.execute("SELECT MAX(generation) FROM scans").fetchone()
+            generation = max(row[0] or 0, self.current_generation()) + 1
+            # Leftovers of an interrupted ingest of this generation
+            with conn:
+                conn.execute("DELETE FROM apps WHERE generation = ?", (generation,))
+
+            seq = 0
+            batch: List[Tuple[Any, ...]] = []
+            for chunk in iter_scored_chunks(records, min(batch_size, INGEST_CHUNK_SIZE)):
+                for app, score, level, codes, extras in chunk:
+                    batch.append(
+                        (generation, seq, app.package_name, app.app_name)
+                        + (json.dumps(app.permissions),)
+                        + tuple(1 if getattr(app, name) else 0 for name in FLAG_FIELDS)
+                        + tuple(getattr(app, name) for name in USAGE_FIELDS)
+                        + (score, level, json.dumps(list(codes)))
+                        + tuple(
+                            None if extras.get(name) is None else str(extras[name])
+                            for name in EXTRA_FIELDS
+                        )
+                    )
+                    seq += 1
+                if on_chunk is not None:
+                    on_chunk(seq)
+                if len(batch) >= batch_size:
+                    with conn:
+                        conn.executemany(_UPSERT, batch)
+                    batch = []
+            with conn:
+                if batch:
+                    conn.executemany(_UPSERT, batch)
+                count = conn.execute(
+                    "SELECT COUNT(*) FROM apps WHERE generation = ?", (generation,)
+                ).fetchone()[0]
+                conn.execute(
+                    "INSERT OR REPLACE INTO scans (generation, finished_at, apps) VALUES (?, ?, ?)",
+                    (generation, time.time(), count),
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('generation', ?)",
+                    (generation,),
+                )
+                oldest = generation - self.keep_generations + 1
+                conn.execute("DELETE FROM apps WHERE generation < ?", (oldest,))
+                conn.execute("DELETE FROM scans WHERE generation < ?", (oldest,))
+            return generation
+
+    def view(self, generation: Optional[int] = None) -> "SQLiteApps":
+        """Read-only view of one stored generation (default: the current one)."""
+        return SQLiteApps(self, self.current_generation() if generation is None else generation)
+
+
+_OPEN: Dict[str, SQLiteInventory] = {}
+_OPEN_LOCK = threading.Lock()
+
+
+def open_inventory(path: str) -> SQLiteInventory:
+    """Process-wide SQLiteInventory for path, so every scan shares one writer."""
+    with _OPEN_LOCK:
+        db = _OPEN.get(path)
+        if db is None:
+            keep = int(os.environ.get("SPYSHIELD_DB_KEEP", DEFAULT_KEEP_GENERATIONS))
+            db = _OPEN[path] = SQLiteInventory(path, keep)
+        return db
+
+
+class SQLiteApps(Mapping[str, SQLiteRow]):
+    """
+    One stored generation as a read-only mapping of package_name -> app
+    row, like the AppStore returned by load_apps, plus the paging and
+    counting queries the front ends need.
+    """
+
+    def __init__(self, db: SQLiteInventory, generation: int):
+        self.db = db
+        self.generation = generation
+
+    def _query(self, sql: str, params: Iterable[Any] = ()) -> sqlite3.Cursor:
+        return self.db.reader().execute(sql, (self.generation, *params))
+
+    def __getitem__(self, package_name: str) -> SQLiteRow:
+        row = self._query(
+            f"SELECT {_SELECT} FROM apps WHERE generation = ? AND package_name = ?",
+            (package_name,),
+        ).fetchone()
+        if row is None:
+            raise KeyError(package_name)
+        return SQLiteRow(row)
+
+    def __contains__(self, package_name: object) -> bool:
+        return (
+            self._query(
+                "SELECT 1 FROM apps WHERE generation = ? AND package_name = ?", (package_name,)
+            ).fetchone()
+            is not None
+        )
+
+    def __iter__(self) -> Iterator[str]:
+        for row in self._query("SELECT package_name FROM apps WHERE generation = ? ORDER BY seq"):
+            yield row[0]
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def count(self, level: Optional[str] = None) -> int:
+        if level is None:
+            return self._query("SELECT COUNT(*) FROM apps WHERE generation = ?").fetchone()[0]
+        return self._query(
+            "SELECT COUNT(*) FROM apps WHERE generation = ? AND risk_level = ?", (level,)
+        ).fetchone()[0]
+
+    def level_counts(self) -> Dict[str, int]:
+        counts = dict.fromkeys(RISK_LEVELS, 0)
+        for level, count in self._query(
+            "SELECT risk_level, COUNT(*) FROM apps WHERE generation = ? GROUP BY risk_level"
+        ):
+            counts[level] = count
+        return counts
+
+    def page(
+        self, level: Optional[str] = None, offset: int = 0, limit: int = 100
+    ) -> List[SQLiteRow]:
+        """One page of apps by descending risk score (ties in scan order)."""
+        where, params = ("AND risk_level = ?", [level]) if level else ("", [])
+        rows = self._query(
+            f"SELECT {_SELECT} FROM apps WHERE generation = ? {where} "
+            "ORDER BY risk_score DESC, seq LIMIT ? OFFSET ?",
+            params + [limit, offset],
+        )
+        return [SQLiteRow(row) for row in rows]
+
+    def ranked_columns(self, names: Iterable[str]) -> Dict[str, List[Any]]:
+        """
+        The named columns of every app, by descending risk score (ties in
+        scan order): one query reading only those columns, for tables.
+        """
+        names = list(names)
+        unknown = [name for name in names if name not in _COLUMNS]
+        if unknown:
+            raise KeyError(", ".join(unknown))
+        rows = self._query(
+            f"SELECT {', '.join(names)} FROM apps WHERE generation = ? "
+            "ORDER BY risk_score DESC, seq"
+        ).fetchall()
+        return {name: [row[i] for row in rows] for i, name in enumerate(names)}
+
+    def top(
+        self, k: int, level: Optional[str] = None, min_score: Optional[float] = None
+    ) -> List[SQLiteRow]:
+        """
+        The k riskiest apps, optionally of one level and scoring at least
+        min_score: an indexed range scan that stops after k rows.
+        """
+        clauses: List[str] = []
+        params: List[Any] = []
+        if level:
+            clauses.append("risk_level = ?")
+            params.append(level)
+        if min_score is not None:
+            clauses.append("risk_score >= ?")
+            params.append(min_score)
+        where = "".join(f" AND {clause}" for clause in clauses)
+        rows = self._query(
+            f"SELECT {_SELECT} FROM apps WHERE generation = ?{where} "
+            "ORDER BY risk_score DESC, seq LIMIT ?",
+            params + [k],
+        )
+        return [SQLiteRow(row) for row in rows]
+
+    def ranked(
+        self,
+        level: Optional[str],
+        flags: Mapping[str, int],
+        after: Optional[Tuple[float, int]],
+        limit: int,
+        permissions: Sequence[str] = (),
+    ) -> Tuple[List[SQLiteRow], Optional[Tuple[float, int]]]:
+        """
+        Keyset-paginated variant of page() with flag and permission
+        filters: up to limit apps ranked after the (risk_score, seq) key
+        `after`, plus the key to continue from (None on the last page).
+        """
+        clauses: List[str] = []
+        params: List[Any] = []
+        if level:
+            clauses.append("risk_level = ?")
+            params.append(level)
+        for name, wanted in flags.items():
+            if name not in FLAG_FIELDS:
+                raise KeyError(name)
+            clauses.append(f"{name} = ?")
+            params.append(wanted)
+        for perm in permissions:
+            clauses.append("EXISTS (SELECT 1 FROM json_each(permissions) WHERE value = ?)")
+            params.append(perm)
+        if after is not None:
+            clauses.append("(risk_score < ? OR (risk_score = ? AND seq > ?))")
+            params.extend((after[0], after[0], after[1]))
+        where = "".join(f" AND {clause}" for clause in clauses)
+        rows = self._query(
+            f"SELECT seq, {_SELECT} FROM apps WHERE generation = ?{where} "
+            "ORDER BY risk_score DESC, seq LIMIT ?",
+            params + [limit + 1],
+        ).fetchall()
+
+        next_key = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_key = (rows[-1]["risk_score"], rows[-1]["seq"])
+        return [SQLiteRow(row) for row in rows], next_key
+
+
+@dataclass(frozen=True)
+class SQLiteSnapshot:
+    """
+    Snapshot counterpart for a SQLiteApps view: same generation/count/
+    page/level_counts interface, answered by SQL instead of in-memory
+    rankings. Diffs between scans are not computed (delta is always None).
+    """
+
+    generation: int
+    apps: SQLiteApps
+    built_at: float
+    scan_seconds: float
+    delta: None = None
+    partial: bool = False
+    level_counts: Dict[str, int] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "level_counts", self.apps.level_counts())
+
+    def count(self, level: Optional[str] = None) -> int:
+        if level is None:
+            return sum(self.level_counts.values())
+        return self.level_counts.get(level, 0)
+
+    def page(
+        self, level: Optional[str] = None, offset: int = 0, limit: int = 100
+    ) -> List[SQLiteRow]:
+        return self.apps.page(level, offset, limit)
+
+    def top(
+        self, k: int, level: Optional[str] = None, min_score: Optional[float] = None
+    ) -> List[SQLiteRow]:
+        return self.apps.top(k, level, min_score)
+
+    def ranked(
+        self,
+        level: Optional[str],
+        flags: Mapping[str, int],
+        cursor: Optional[Dict[str, Any]],
+        limit: int,
+        permissions: Sequence[str] = (),
+    ) -> Tuple[List[SQLiteRow], Optional[Dict[str, Any]]]:
+        """
+        See Snapshot.ranked. Cursors hold the (risk_score, seq) key of the
+        last app; after a rescan they resume at the same score position.
+        """
+        after = None
+        if cursor is not None:
+            after = (float(cursor["s"]), int(cursor["q"]))
+            if not math.isfinite(after[0]):
+                raise ValueError(f"Cursor score is not finite: {after[0]}")
+        apps, key = self.apps.ranked(level, flags, after, limit, permissions)
+        if key is None:
+            return apps, None
+        return apps, {"g": self.generation, "s": key[0], "q": key[1]}
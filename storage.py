@@ -3,12 +3,43 @@
 # Final, Streamlit-safe storage layer.
 # - On Windows (local): tries to scan installed apps via registry (scanner_windows.py).
 # - On all other OS (Linux/macOS/Streamlit Cloud): uses embedded sample data.
-# - NO file access at all. NO FileNotFoundError possible.
+# - Files are only read when an inventory file is passed explicitly (or via
+#   the SPYSHIELD_INVENTORY environment variable), plus the registry scan
+#   cache on Windows; the non-Windows default never touches the filesystem.
+# - Results are kept in memory unless SPYSHIELD_DB names a SQLite database
+#   to persist them in (see sqlite_store.py).
+#
+# Inventory files (JSON array or JSONL, optionally gzip-compressed) are
+# streamed: records are parsed, scored and stored in bounded chunks, so a
+# multi-GB fleet export never has to be held in memory as raw JSON.
 
+import gzip
+import io
+import json
+import os
 import platform
-from typing import Dict, List, Any
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from appstore import AppStore, EXTRA_FIELDS
+from metrics import METRICS, STAGE_SECONDS, stage
+from models import RISK_MEMO, AppInfo
 
-from models import AppInfo, compute_risk
+if TYPE_CHECKING:
+    # sqlite_store imports this module
+    from sqlite_store import SQLiteApps
 
 # Embedded sample data used on non-Windows (e.g. Streamlit Cloud) or as fallback.
 EMBEDDED_SAMPLE_APPS: List[dict] = [
@@ -111,11 +142,26 @@ def _load_from_windows_registry() -> List[dict]:
     If anything fails, fall back to embedded sample data.
     """
     try:
-        from scanner_windows import get_installed_apps_windows
+        from scanner_windows import (
+            RegistryScanCache,
+            default_registry_cache_path,
+            get_installed_apps_windows,
+        )
 
         print("[SpyShield] Detected Windows OS; scanning installed applications...")
-        raw_list = get_installed_apps_windows()
+        cache_path = default_registry_cache_path()
+        cache = RegistryScanCache.load(cache_path) if cache_path else None
+        raw_list = get_installed_apps_windows(cache=cache)
         print(f"[SpyShield] Found {len(raw_list)} installed applications in registry.")
+        if cache is not None:
+            print(
+                f"[SpyShield] Registry cache: {cache.reused} subkeys unchanged, "
+                f"{cache.read} read."
+            )
+            try:
+                cache.save()
+            except OSError as exc:
+                print("[SpyShield] Could not save registry scan cache:", exc)
         if not raw_list:
             print("[SpyShield] Registry scan returned no apps, using embedded sample data.")
             return EMBEDDED_SAMPLE_APPS
@@ -126,36 +172,261 @@ def _load_from_windows_registry() -> List[dict]:
         return EMBEDDED_SAMPLE_APPS
 
 
-def load_apps() -> Dict[str, dict]:
+# ---------- Streaming ingest ----------
+
+INGEST_CHUNK_SIZE = 1000
+_READ_SIZE = 1 << 16
+# A decode error this close to the end of the buffer may just be an element
+# cut off mid-token (e.g. "tru"), so more input is read before giving up.
+_TRUNCATION_SLACK = 16
+
+# (app, score, level, reason codes, extras) for one ingested record
+ScoredRecord = Tuple[AppInfo, float, str, Sequence[str], Dict[str, Any]]
+
+# progress(scored, total, store), called by load_apps after every ingested
+# chunk: apps scored so far, the total if known up front (None for
+# streamed files), and the AppStore being built (None with SPYSHIELD_DB).
+Progress = Callable[[int, Optional[int], Optional[AppStore]], None]
+
+
+def _open_inventory(path: str) -> io.TextIOBase:
+    """
+    Open an inventory file as text, transparently un-gzipping it. A UTF-8
+    byte order mark is dropped, whatever the format. Closing the returned
+    stream closes the file.
+    """
+    with open(path, "rb") as probe:
+        compressed = probe.read(2) == b"\x1f\x8b"
+    binary = gzip.open(path, "rb") if compressed else open(path, "rb")
+    return io.TextIOWrapper(binary, encoding="utf-8-sig")
+
+
+def _maybe_truncated(exc: json.JSONDecodeError, length: int) -> bool:
+    """Whether the error could go away once more text is appended."""
+    # An unterminated string is reported at its opening quote
+    return exc.msg.startswith("Unterminated string") or exc.pos >= length - _TRUNCATION_SLACK
+
+
+def _iter_json_array(stream: io.TextIOBase, buf: str, offset: int = 0) -> Iterator[dict]:
+    """
+    Yield the elements of a top-level JSON array one by one, reading the
+    stream in fixed-size pieces. `buf` holds text already read, starting
+    just after the opening "[", at character `offset` of the file.
+
+    Elements must be JSON objects separated by single commas; anything
+    else raises ValueError naming the character offset.
+    """
+    decoder = json.JSONDecoder()
+    pos = 0
+    eof = False
+    # What may come next: "first" (an element or "]"), "element", or
+    # "separator" ("," or "]")
+    expect = "first"
+    while True:
+        # Skip whitespace, reading more as needed
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n":
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            offset += len(buf)
+            buf, pos = stream.read(_READ_SIZE), 0
+            eof = not buf
+        if pos >= len(buf):
+            raise ValueError("Inventory JSON array is not terminated")
+
+        char = buf[pos]
+        if expect == "separator":
+            if char == "]":
+                return
+            if char != ",":
+                raise ValueError(f"Expected ',' or ']' at offset {offset + pos} of inventory")
+            pos += 1
+            expect = "element"
+            continue
+        if char == "]":
+            if expect == "first":
+                return
+            raise ValueError(f"Trailing comma before ']' at offset {offset + pos} of inventory")
+
+        try:
+            record, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError as exc:
+            if eof or not _maybe_truncated(exc, len(buf)):
+                # Malformed: fail now rather than buffering the rest of the file
+                raise ValueError(
+                    f"Malformed inventory element at offset {offset + exc.pos}: {exc.msg}"
+                ) from exc
+            # Element is split across reads: keep the unparsed tail, read more
+            more = stream.read(_READ_SIZE)
+            eof = not more
+            offset += pos
+            buf, pos = buf[pos:] + more, 0
+            continue
+        if not isinstance(record, dict):
+            raise ValueError(f"Inventory element at offset {offset + pos} is not a JSON object")
+
+        yield record
+        pos = end
+        expect = "separator"
+        if pos > _READ_SIZE:
+            offset += pos
+            buf, pos = buf[pos:], 0
+
+
+def iter_inventory_records(path: str) -> Iterator[dict]:
+    """
+    Stream raw app records from a JSON array or JSONL file (either may be
+    gzip-compressed). The format is detected from the first character.
+    """
+    with _open_inventory(path) as stream:
+        head = stream.read(_READ_SIZE)
+        stripped = head.lstrip(" \t\r\n")
+        if stripped.startswith("["):
+            start = len(head) - len(stripped) + 1
+            yield from _iter_json_array(stream, stripped[1:], start)
+            return
+
+        # JSONL: one object per line, blank lines ignored
+        pending = head
+        line_no = 0
+        while True:
+            lines = pending.split("\n")
+            pending = lines.pop()
+            for line in lines:
+                line_no += 1
+                if line.strip():
+                    yield _jsonl_record(line, line_no)
+            more = stream.read(_READ_SIZE)
+            if not more:
+                break
+            pending += more
+        if pending.strip():
+            yield _jsonl_record(pending, line_no + 1)
+
+
+def _jsonl_record(line: str, line_no: int) -> dict:
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError as exc:
+        raise ValueError(f"Malformed inventory record on line {line_no}: {exc.msg}") from exc
+    if not isinstance(record, dict):
+        raise ValueError(f"Inventory record on line {line_no} is not a JSON object")
+    return record
+
+
+def iter_scored_chunks(
+    records: Iterable[dict],
+    chunk_size: int = INGEST_CHUNK_SIZE,
+) -> Iterator[List[ScoredRecord]]:
+    """
+    Turn raw records into AppInfo objects and score them, yielding lists of
+    at most chunk_size scored records. Only one chunk is alive at a time.
+    Scoring is score-only: reasons are kept as reason codes, rendered to
+    text later by whatever displays them (models.render_reasons).
+
+    Scores come from RISK_MEMO, so an app whose scoring inputs were seen
+    before (in this scan or an earlier one) is not scored again.
+
+    With metrics enabled, the time spent scoring is recorded as one
+    observation of the "score" stage once all records are consumed.
+    """
+    timed = METRICS.enabled
+    score_seconds = 0.0
+    chunk: List[ScoredRecord] = []
+    for raw in records:
+        app = AppInfo.from_dict(raw)
+        if timed:
+            start = time.perf_counter()
+            score, level, codes = RISK_MEMO.score(app)
+            score_seconds += time.perf_counter() - start
+        else:
+            score, level, codes = RISK_MEMO.score(app)
+        # Pass through extra metadata if present
+        extras = {key: raw[key] for key in EXTRA_FIELDS if key in raw}
+        chunk.append((app, score, level, codes, extras))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+    if timed:
+        STAGE_SECONDS.observe(score_seconds, "score")
+
+
+def build_store(
+    records: Iterable[dict],
+    chunk_size: int = INGEST_CHUNK_SIZE,
+    store: Optional[AppStore] = None,
+    on_chunk: Optional[Callable[[int, AppStore], None]] = None,
+) -> AppStore:
+    """
+    Score records chunk by chunk into an AppStore (a new one by default).
+    on_chunk(scored, store) is called after each chunk is stored.
+    """
+    if store is None:
+        store = AppStore()
+    scored = 0
+    for chunk in iter_scored_chunks(records, chunk_size):
+        for app, score, level, codes, extras in chunk:
+            store.add(app, score, level, codes, extras)
+        scored += len(chunk)
+        if on_chunk is not None:
+            on_chunk(scored, store)
+    return store
+
+
+def load_apps(
+    inventory_path: Optional[str] = None,
+    db_path: Optional[str] = None,
+    progress: Optional[Progress] = None,
+) -> Union[AppStore, "SQLiteApps"]:
     """
     Main entry: load apps for the dashboard / Streamlit app.
 
+    - With an inventory file (argument or SPYSHIELD_INVENTORY): streams it.
     - On Windows: attempts registry scan, with safe fallback.
     - On other OS (Linux/macOS/Streamlit Cloud): uses embedded sample data only.
+
+    Returns a columnar AppStore. It is a read-only mapping of
+    package_name -> row view, so it can be used like the old dict of dicts.
+    Apps scored before are not scored again (see iter_scored_chunks), and
+    delta.diff_stores(previous, result) lists what changed between scans.
+
+    With a database (argument or SPYSHIELD_DB), the scan is stored there
+    as a new generation instead, and a SQLiteApps view of it (the same
+    kind of read-only mapping, answered by SQL) is returned.
+
+    `progress` is called after every ingested chunk (see Progress), e.g.
+    to report a running scan or show its first results early.
     """
+    inventory_path = inventory_path or os.environ.get("SPYSHIELD_INVENTORY")
+    db_path = db_path or os.environ.get("SPYSHIELD_DB")
     system = platform.system().lower()
 
-    if system == "windows":
-        raw_list = _load_from_windows_registry()
+    raw_records: Iterable[dict]
+    if inventory_path:
+        print(f"[SpyShield] Streaming inventory from {inventory_path}.")
+        raw_records = iter_inventory_records(inventory_path)
+    elif system == "windows":
+        raw_records = _load_from_windows_registry()
     else:
         print(f"[SpyShield] OS={system}. Using embedded sample data only.")
-        raw_list = EMBEDDED_SAMPLE_APPS
+        raw_records = EMBEDDED_SAMPLE_APPS
+    total = len(raw_records) if isinstance(raw_records, list) else None
 
-    apps: Dict[str, dict] = {}
-    for raw in raw_list:
-        app = AppInfo.from_dict(raw)
-        score, level, reasons = compute_risk(app)
+    def report(scored: int, store: Optional[AppStore] = None) -> None:
+        if progress is not None:
+            progress(scored, total, store)
 
-        info: Dict[str, Any] = app.to_dict()
-        info["risk_score"] = score
-        info["risk_level"] = level
-        info["risk_reasons"] = reasons
-
-        # Pass through extra metadata if present
-        for extra_key in ("publisher", "install_location"):
-            if extra_key in raw:
-                info[extra_key] = raw[extra_key]
+    if db_path:
+        from sqlite_store import open_inventory
 
-        apps[app.package_name] = info
+        db = open_inventory(db_path)
+        with stage("ingest"):
+            generation = db.ingest(raw_records, on_chunk=report)
+        print(f"[SpyShield] Stored scan as generation {generation} in {db_path}.")
+        return db.view(generation)
 
-    return apps
+    with stage("ingest"):
+        return build_store(raw_records, on_chunk=report)
@@ -3,10 +3,33 @@
 # SpyShield – Streamlit version
 # This file is the main entrypoint for Streamlit Cloud.
 
+import os
+import time
+from typing import Optional
+
 import pandas as pd
 import streamlit as st
 
-from storage import load_apps
+from appstore import RISK_LEVELS
+from assets import minify_css
+from dashboard import (
+    SOURCE_LABELS,
+    TABLE_WINDOW,
+    app_labels,
+    filter_table,
+    risk_table,
+    source_label,
+    table_window,
+)
+from metrics import METRICS, RENDER_SECONDS, diagnostics, snapshot_samples
+from scan_jobs import ScanJob
+from snapshot import AnySnapshot, SnapshotRefresher
+
+# Streamlit reruns this script on every widget interaction. The scan and
+# everything derived from it are cached per process and per snapshot
+# generation, so interactions never rescan. Scans are refreshed in the
+# background every SCAN_TTL_SECONDS, or on demand with "Rescan now".
+SCAN_TTL_SECONDS = float(os.environ.get("SPYSHIELD_SCAN_TTL", "300"))
 
 # ---------- PAGE CONFIG ----------
 st.set_page_config(
@@ -128,17 +151,63 @@ CUSTOM_CSS = """
 }
 </style>
 """
-st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
+# Sent with every rerun (Streamlit has no cacheable stylesheet for apps),
+# so send it minified.
+st.markdown(minify_css(CUSTOM_CSS), unsafe_allow_html=True)
 
 # ---------- LOAD DATA ----------
-apps_dict = load_apps()
-apps_list = list(apps_dict.values())
-apps_list.sort(key=lambda x: x.get("risk_score", 0), reverse=True)
+@st.cache_resource
+def get_refresher() -> SnapshotRefresher:
+    """
+    One refresher per server process, shared by all sessions. The first
+    scan runs in the background, so the page renders straight away and
+    fills in as batches are scored.
+    """
+    refresher = SnapshotRefresher(
+        interval=SCAN_TTL_SECONDS,
+        snapshot_path=os.environ.get("SPYSHIELD_SNAPSHOT") or None,
+    )
+    if not refresher.load_file():
+        refresher.request_refresh("startup")
+    refresher.start()
+    return refresher
+
+
+def watched_job(refresher: SnapshotRefresher, snapshot: AnySnapshot) -> Optional[ScanJob]:
+    """
+    The scan this session asked for; else, until a scan has completed,
+    the latest one (the startup scan, or a retry after it failed).
+    """
+    job_id = st.session_state.get("scan_job")
+    job = refresher.jobs.get(job_id) if job_id is not None else None
+    if job is None and (snapshot.partial or snapshot.generation == 0):
+        job = refresher.jobs.latest()
+    return job
+
+
+# Keyed by generation; the snapshot itself is not hashed (leading "_").
+@st.cache_resource(max_entries=2)
+def build_table(generation: int, _snapshot: AnySnapshot) -> pd.DataFrame:
+    with RENDER_SECONDS.time("streamlit_table"):
+        return risk_table(_snapshot)
 
-total_apps = len(apps_list)
-high_count = sum(1 for a in apps_list if a.get("risk_level") == "High")
-med_count = sum(1 for a in apps_list if a.get("risk_level") == "Medium")
-low_count = sum(1 for a in apps_list if a.get("risk_level") == "Low")
+
+refresher = get_refresher()
+with st.sidebar:
+    if st.button("Rescan now"):
+        st.session_state["scan_job"] = refresher.request_refresh().id
+    show_diagnostics = METRICS.enabled and st.checkbox("Show diagnostics")
+
+snapshot = refresher.current
+apps_dict = snapshot.apps
+job = watched_job(refresher, snapshot)
+# Rerun until the scan is done (or failed), picking up each partial snapshot
+scan_pending = job is not None and not job.finished
+
+total_apps = snapshot.count()
+high_count = snapshot.count("High")
+med_count = snapshot.count("Medium")
+low_count = snapshot.count("Low")
 
 # ---------- HEADER ----------
 st.markdown(
@@ -178,6 +247,15 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
+if scan_pending:
+    done = (job.progress if job is not None else None) or 0.0
+    status = f"{job.scored} apps scored" if job is not None else "starting"
+    if snapshot.partial:
+        status += f", showing the first {total_apps}"
+    st.progress(done, text=f"Scanning installed applications... {status}")
+elif job is not None and job.error:
+    st.warning(f"Last scan failed: {job.error}")
+
 # ---------- MAIN LAYOUT ----------
 col_table, col_detail = st.columns([1.4, 1.1])
 
@@ -185,33 +263,42 @@ col_table, col_detail = st.columns([1.4, 1.1])
 with col_table:
     st.markdown("#### Apps & Risk Scores")
 
-    if apps_list:
-        # build a DataFrame for nice display
-        df = pd.DataFrame(
-            [
-                {
-                    "App": a.get("app_name"),
-                    "Package / ID": a.get("package_name"),
-                    "Risk Score": round(a.get("risk_score", 0), 1),
-                    "Risk Level": a.get("risk_level"),
-                    "Source": "Trusted / Store"
-                    if a.get("installed_from_play_store")
-                    else "Unknown / Sideloaded",
-                }
-                for a in apps_list
-            ]
+    window = None
+    if total_apps:
+        # build a DataFrame for nice display (once per snapshot generation)
+        df = build_table(snapshot.generation, snapshot)
+
+        # Filter and page here, so the browser only receives the rows shown
+        col_level, col_source, col_search = st.columns([1, 1.2, 1.6])
+        with col_level:
+            level_choice = st.selectbox("Risk level", ["All", *RISK_LEVELS[::-1]])
+        with col_source:
+            source_choice = st.selectbox("Source", ["All", *SOURCE_LABELS])
+        with col_search:
+            search = st.text_input("Search", placeholder="App or package name")
+        matches = filter_table(
+            df,
+            level=None if level_choice == "All" else level_choice,
+            source=None if source_choice == "All" else source_choice,
+            search=search.strip(),
         )
+        pages = max(1, -(-len(matches) // TABLE_WINDOW))
+        page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1)
+        window = table_window(matches, page)
 
         st.markdown('<div class="spyshield-table-container">', unsafe_allow_html=True)
         st.dataframe(
-            df,
+            window,
             use_container_width=True,
             height=480,
             hide_index=True,
         )
         st.markdown("</div>", unsafe_allow_html=True)
+        first = (min(page, pages) - 1) * TABLE_WINDOW
         st.caption(
-            "Tip: Use the scroll bars and column sort to explore installed applications."
+            f"Showing {first + 1 if len(window) else 0}-{first + len(window)} "
+            f"of {len(matches)} matching apps, riskiest first. Column sort applies "
+            "to the rows shown; use the filters and pages to explore the rest."
         )
     else:
         st.info(
@@ -224,17 +311,17 @@ with col_table:
 with col_detail:
     st.markdown("#### Selected App Details")
 
-    if apps_list:
-        # Create a mapping of label -> app for the selector
-        label_to_pkg = {
-            f"{a.get('app_name')} ({a.get('package_name')})": a.get("package_name")
-            for a in apps_list
-        }
-        labels_sorted = sorted(label_to_pkg.keys())
+    if window is not None and len(window):
+        # Only the current page goes to the browser; the table's search
+        # (app or package name) brings any other app onto it.
+        label_to_pkg, labels_sorted = app_labels(window)
         default_label = labels_sorted[0]
 
         selected_label = st.selectbox(
-            "Choose an app to inspect:", labels_sorted, index=labels_sorted.index(default_label)
+            "Choose an app to inspect:",
+            labels_sorted,
+            index=labels_sorted.index(default_label),
+            help="Apps on the current table page. Use Search to find any other app.",
         )
         selected_pkg = label_to_pkg[selected_label]
         app = apps_dict[selected_pkg]
@@ -244,9 +331,7 @@ with col_detail:
 
         risk_level = app.get("risk_level", "Unknown")
         risk_score = round(app.get("risk_score", 0), 1)
-        source_text = (
-            "Trusted / Store" if app.get("installed_from_play_store") else "Unknown / Sideloaded"
-        )
+        source_text = source_label(app)
         publisher = app.get("publisher", "") or "Unknown"
         install_location = app.get("install_location", "") or "N/A"
 
@@ -322,11 +407,25 @@ with col_detail:
             st.write("No specific suspicious patterns detected for this application.")
 
         st.markdown("</div>", unsafe_allow_html=True)
+    elif total_apps:
+        st.info("No apps match the current filters.")
     else:
         st.info(
             "Once applications are loaded, you can inspect individual app details here."
         )
 
+# ---------- DIAGNOSTICS ----------
+if show_diagnostics:
+    with st.expander("Diagnostics", expanded=True):
+        diag = diagnostics(snapshot_samples(snapshot))
+        st.markdown("**Pipeline stages** (seconds; p50/p95 are bucket upper bounds)")
+        if diag["stages"]:
+            st.dataframe(pd.DataFrame(diag["stages"]), use_container_width=True, hide_index=True)
+        else:
+            st.write("Nothing timed yet in this process.")
+        st.markdown("**Snapshot**")
+        st.dataframe(pd.DataFrame(diag["values"]), use_container_width=True, hide_index=True)
+
 # ---------- FOOTER ----------
 st.markdown(
     """
@@ -336,3 +435,7 @@ st.markdown(
 """,
     unsafe_allow_html=True,
 )
+
+if scan_pending:
+    time.sleep(1)
+    st.rerun()
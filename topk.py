@@ -0,0 +1,47 @@
+# topk.py
+#
+# Bounded "worst offenders" queries over risk scores without sorting
+# everything: a running top-K heap for streams (fleet scoring). Snapshots
+# answer top-K and score-threshold queries from their precomputed ranking
+# (Snapshot.top).
+
+import heapq
+from typing import Generic, Iterable, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class TopK(Generic[T]):
+    """
+    The k largest items pushed so far, kept in a min-heap of size k, so a
+    stream of n items costs O(n log k) time and O(k) memory. Items are
+    compared as-is: push (score, ...) tuples to rank by score.
+    """
+
+    def __init__(self, k: int) -> None:
+        self.k = k
+        self._heap: List[T] = []
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, item: T) -> None:
+        heap = self._heap
+        if len(heap) < self.k:
+            heapq.heappush(heap, item)
+        elif self.k and item > heap[0]:
+            heapq.heapreplace(heap, item)
+
+    def extend(self, items: Iterable[T]) -> None:
+        for item in items:
+            self.push(item)
+
+    @property
+    def floor(self) -> Optional[T]:
+        """Smallest item kept once k items are held (None until then)."""
+        return self._heap[0] if self.k and len(self._heap) == self.k else None
+
+    def items(self) -> List[T]:
+        """The kept items, largest first."""
+        return sorted(self._heap, reverse=True)
+